@@ -1,14 +1,27 @@
-from flask import Flask, request, jsonify,send_file
+import io
+import os
+from flask import Flask, Response, request, jsonify,send_file
 from flask_cors import CORS
-from backend.services.manuel_forecast import predict_sales
-from backend.services.csv_formatting import predict_from_csv
-import webbrowser
+from backend.services.manuel_forecast import predict_sales, predict_sales_batch
+from backend.services.csv_formatting import predict_from_csv, report_payload
 from backend.services.pdfgen import generate_pdf_report
-from backend.services.sarima_forecast import forecast_sarima
-from backend.services.segmented_forecast import segment_forecast
+from backend.services.sarima_forecast import forecast_sarima, update_sarima
+from backend.services.segmented_forecast import segment_forecast, segment_forecast_all
+from backend.services import model_registry
+from backend.services.model_bank import bank
+from backend.services.result_cache import upload_cache
+from backend.services import report_jobs
+from backend.services import metrics
+from backend.services import executors
+from backend.services import datasets
 
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
+
+@app.errorhandler(executors.Busy)
+def busy(e):
+    return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
 
 @app.route("/", methods=["GET"])
 def home():
@@ -26,29 +39,120 @@ def predict_manual():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+@app.route("/predict/manual/batch", methods=["POST"])
+def predict_manual_batch():
+    return executors.run("manual", predict_sales_batch, request)
+
 @app.route("/forecast", methods=["POST"])
 def predict_manual_alias():
     return predict_manual()
 
 @app.route("/forecast/csv", methods=["POST"])
 def forecast_csv():
-    return predict_from_csv(request)
+    return executors.run("csv", predict_from_csv, request)
 
 @app.route("/download-report",methods=["POST"])
 def download():
-    data=request.get_json()
-    pdfpath=generate_pdf_report(data)
-    return send_file(pdfpath,as_attachment=True, download_name="Sales_report.pdf")
+    try:
+        data=report_payload(request.get_json())
+    except LookupError as e:
+        return datasets.unknown(e.args[0])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    pdf=executors.run_in_process("report", generate_pdf_report, data)
+    return send_file(pdf,mimetype="application/pdf",as_attachment=True, download_name="Sales_report.pdf")
+
+@app.route("/reports", methods=["POST"])
+def submit_report():
+    try:
+        job = report_jobs.submit(report_payload(request.get_json()) or {})
+    except report_jobs.QueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+    except LookupError as e:
+        return datasets.unknown(e.args[0])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({**report_jobs.describe(job), "status_url": f"/reports/{job['id']}"}), 202
+
+@app.route("/reports/<job_id>", methods=["GET"])
+def report_status(job_id):
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown report job"}), 404
+    if job["status"] == "done":
+        return send_file(
+            io.BytesIO(job["pdf"]),
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name="Sales_report.pdf"
+        )
+    if job["status"] == "failed":
+        return jsonify(report_jobs.describe(job)), 200
+    return jsonify(report_jobs.describe(job)), 202
 
 @app.route("/forecast/sarima", methods=["POST"])
 def sarima_live():
-    from backend.services.sarima_forecast import forecast_sarima
-    return forecast_sarima(request)
+    return executors.run("sarima", forecast_sarima, request)
+
+@app.route("/forecast/sarima/update", methods=["POST"])
+def sarima_update():
+    return executors.run("sarima", update_sarima, request)
 
 @app.route("/forecast/segmented", methods=["POST"])
 def forecast_segmented():
-    return segment_forecast(request)
+    return executors.run("segmented", segment_forecast, request)
+
+@app.route("/forecast/segmented/all", methods=["POST"])
+def forecast_segmented_all():
+    return executors.run("segmented", segment_forecast_all, request)
+
+@app.route("/datasets", methods=["POST"])
+def create_dataset():
+    return executors.run("csv", datasets.create_dataset, request)
+
+@app.route("/datasets", methods=["GET"])
+def dataset_stats():
+    return jsonify(datasets.store.stats())
+
+@app.route("/datasets/<dataset_id>", methods=["GET"])
+def dataset_info(dataset_id):
+    return datasets.dataset_info(dataset_id)
+
+@app.route("/datasets/<dataset_id>", methods=["DELETE"])
+def delete_dataset(dataset_id):
+    return datasets.delete_dataset(dataset_id)
+
+@app.route("/datasets/<dataset_id>/trend", methods=["GET"])
+def dataset_trend(dataset_id):
+    return datasets.dataset_trend(dataset_id)
+
+@app.route("/models", methods=["GET"])
+def models_status():
+    return jsonify(model_registry.model_stats())
+
+@app.route("/models/segments", methods=["GET"])
+def segment_models_status():
+    return jsonify(bank.stats())
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(upload_cache.stats())
+
+@app.route("/executors", methods=["GET"])
+def executor_stats():
+    return jsonify(executors.stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics_text():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
-    webbrowser.open("http://127.0.0.1:5000")
-    app.run(debug=True,use_reloader=False)
+    # development server only, production runs backend.wsgi under gunicorn
+    model_registry.preload()
+    app.run(
+        host=os.environ.get("SPARKSALES_HOST", "127.0.0.1"),
+        port=int(os.environ.get("SPARKSALES_PORT", 5000)),
+        debug=os.environ.get("SPARKSALES_DEBUG", "0") == "1",
+        use_reloader=False,
+        threaded=True
+    )
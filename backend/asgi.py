@@ -0,0 +1,13 @@
+"""
+ASGI entry point, the Flask app behind asgiref's WSGI adapter
+
+    uvicorn backend.asgi:app --workers 2
+
+each request runs on the adapter's thread pool and the heavy service
+calls are still bounded by backend.services.executors
+"""
+from asgiref.wsgi import WsgiToAsgi
+
+from backend.wsgi import app as wsgi_app
+
+app = WsgiToAsgi(wsgi_app)
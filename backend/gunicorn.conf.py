@@ -0,0 +1,19 @@
+import os
+
+wsgi_app = "backend.wsgi:app"
+bind = os.environ.get("SPARKSALES_BIND", "0.0.0.0:5000")
+
+# threaded workers: request threads mostly wait on the executors,
+# the CPU-bound work is capped per process by SPARKSALES_CPU_WORKERS
+workers = int(os.environ.get("SPARKSALES_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("SPARKSALES_THREADS", 8))
+
+# import the app and load the models in the master before forking
+preload_app = True
+timeout = int(os.environ.get("SPARKSALES_TIMEOUT", 120))
+graceful_timeout = 30
+max_requests = int(os.environ.get("SPARKSALES_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
@@ -0,0 +1,441 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sklearn.ensemble import RandomForestRegressor
+
+from backend.services.csv_loader import load_base_csv, SEGMENT_COLS
+from backend.services.date_parsing import parse_dates
+from backend.services.featureeng import (
+    LAGS,
+    WINDOW,
+    feature_matrix,
+    grouped_lag_features,
+    valid_rows
+)
+from backend.services.forest_engine import compile_forest
+from backend.services.horizon_forecast import SERVED_CLOSED, recursive_forecast
+from backend.services.sarima import load_daily_sales, _fit
+from backend.services import model_registry
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MONTHLY_PATH = os.path.join(PROJECT_ROOT, "data", "processed", "monthly.csv")
+DAILY_PATH = os.path.join(PROJECT_ROOT, "data", "cleaned", "clean.csv")
+REPORT_PATH = os.path.join(model_registry.MODEL_DIR, "backtest_report.json")
+
+DEFAULT_FEATURE_COLS = [
+    "month", "quarter", "year", "lag_1", "lag_2", "lag_3", "rolling_mean_3", "rolling_std_3"
+]
+# horizon and fold count per series, one fold per horizon back from the end
+SERIES = {
+    "monthly": {"horizon": 3, "folds": 6, "freq": "ME"},
+    "daily": {"horizon": 30, "folds": 6, "freq": "D"},
+    "segments": {"horizon": 30, "folds": 4, "freq": "D"},
+}
+MODELS = ("rf", "sarima", "naive")
+# a SARIMA fit per segment and fold takes seconds each, opt in with --segment-models
+SEGMENT_MODELS = ("rf", "naive")
+MONTHLY_SARIMA = ((1, 1, 0), (0, 1, 0, 12))
+DAILY_SARIMA = ((1, 1, 1), (1, 1, 1, 7))
+# shortest training window a fold may start from
+MIN_TRAIN = 12
+DEPTH = max(max(LAGS), WINDOW)
+
+_data = None
+
+
+def _init_worker(data):
+    global _data
+    _data = data
+
+
+def rolling_origins(n, folds, horizon, min_train=MIN_TRAIN):
+    """
+    expanding-window origins, the last fold ends at the last observation
+    """
+    origins = [n - horizon * k for k in range(folds, 0, -1)]
+    return [o for o in origins if o >= min_train]
+
+
+def scores(actual, pred):
+    actual = np.asarray(actual, dtype=np.float64)
+    err = np.asarray(pred, dtype=np.float64) - actual
+    nonzero = actual != 0
+    return {
+        "mae": float(np.abs(err).mean()),
+        # days without sales have no percentage error
+        "mape": float(np.abs(err[nonzero] / actual[nonzero]).mean() * 100) if nonzero.any() else None,
+        "rmse": float(np.sqrt((err ** 2).mean()))
+    }
+
+
+def rf_params(trees=None):
+    """
+    hyperparameters of the shipped forest, refit per fold on one core
+    (folds already run in parallel)
+    """
+    try:
+        params = model_registry.get_model().get_params()
+    except (OSError, AttributeError):
+        params = {"n_estimators": 200, "random_state": 42}
+    params["n_jobs"] = 1
+    if trees:
+        params["n_estimators"] = trees
+    return params
+
+
+def sarima_orders():
+    """
+    daily orders from the trained model's metadata when there is one
+    """
+    try:
+        with open(model_registry.SARIMA_META_PATH) as f:
+            meta = json.load(f)
+        daily = (tuple(meta["order"]), tuple(meta["seasonal_order"]))
+    except (OSError, KeyError, ValueError):
+        daily = DAILY_SARIMA
+    return {"monthly": MONTHLY_SARIMA, "daily": daily, "segments": daily}
+
+
+def load_monthly(path=MONTHLY_PATH):
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.lower().str.strip()
+    df["date"], _ = parse_dates(df["order date"], dayfirst=False)
+    df = df.dropna(subset=["date", "sales"]).sort_values("date")
+    return df["date"].to_numpy(), df["sales"].to_numpy(np.float64)
+
+
+def load_daily(path=DAILY_PATH):
+    series = load_daily_sales(path)
+    return series.index.to_numpy(), series.to_numpy(np.float64)
+
+
+def prepare(names, feature_cols, monthly_path=MONTHLY_PATH, daily_path=DAILY_PATH):
+    """
+    loads every series and builds its feature matrix once, folds only
+    slice rows out of it (row t only looks at values before t, so the
+    rows before an origin are exactly what a fold may train on); the
+    rolling window is the one recursive_forecast serves
+    """
+    data = {"feature_cols": feature_cols, "series": {}, "feature_time_s": {}}
+
+    for name in names:
+        start = time.perf_counter()
+        if name == "segments":
+            df = load_base_csv(daily_path, dayfirst=False)
+            agg, starts = grouped_lag_features(df, SEGMENT_COLS, closed=SERVED_CLOSED)
+            X = agg[feature_cols].to_numpy(np.float64)
+            item = {
+                "dates": agg["order_date"].to_numpy(),
+                "values": agg["sales"].to_numpy(np.float64),
+                "X": X,
+                "valid": valid_rows(len(agg), starts, closed=SERVED_CLOSED),
+                "bounds": np.append(starts, len(agg)),
+                "keys": [tuple(row) for row in agg[SEGMENT_COLS].iloc[starts].itertuples(index=False)]
+            }
+        else:
+            dates, values = load_monthly(monthly_path) if name == "monthly" else load_daily(daily_path)
+            X, valid = feature_matrix(dates, values, feature_cols, closed=SERVED_CLOSED)
+            item = {"dates": dates, "values": values, "X": X, "valid": valid}
+
+        item.update(SERIES[name])
+        data["series"][name] = item
+        data["feature_time_s"][name] = round(time.perf_counter() - start, 4)
+    return data
+
+
+def _fit_rf(X, y):
+    model = RandomForestRegressor(**_data["rf_params"]).fit(X, y)
+    return compile_forest(model) or model
+
+
+def _series_fold(name, model_name, fold, origin):
+    """
+    pool worker: one expanding-window fold of a single series
+    """
+    s = _data["series"][name]
+    values, dates, h = s["values"], s["dates"], s["horizon"]
+    actual = values[origin:origin + h]
+
+    start = time.perf_counter()
+    if model_name == "rf":
+        train = np.flatnonzero(s["valid"][:origin])
+        model = _fit_rf(s["X"][train], values[train])
+        fitted = time.perf_counter()
+        pred, _ = recursive_forecast(
+            model, _data["feature_cols"], values[None, origin - DEPTH:origin],
+            dates[origin - 1:origin], len(actual), s["freq"]
+        )
+        pred = pred[0]
+    elif model_name == "sarima":
+        order, seasonal_order = _data["sarima_orders"][name]
+        history = pd.Series(values[:origin], index=pd.DatetimeIndex(dates[:origin], freq=s["freq"]))
+        fit = _fit(history, order, seasonal_order)
+        fitted = time.perf_counter()
+        pred = fit.forecast(steps=len(actual)).to_numpy()
+    else:
+        fitted = start
+        pred = np.repeat(values[origin - 1], len(actual))
+    done = time.perf_counter()
+
+    return {
+        "series": name,
+        "model": model_name,
+        "fold": fold,
+        "origin": str(pd.Timestamp(dates[origin]).date()),
+        "train_rows": int(origin),
+        "test_rows": len(actual),
+        **scores(actual, pred),
+        "fit_time_s": round(fitted - start, 4),
+        "predict_time_s": round(done - fitted, 4)
+    }
+
+
+def _segment_slices(s, origin, end):
+    """
+    (segment, first train row, origin row, end row) for every segment
+    with enough history before origin and at least one row after it
+    """
+    out = []
+    bounds, dates = s["bounds"], s["dates"]
+    for g in range(len(bounds) - 1):
+        b0, b1 = bounds[g], bounds[g + 1]
+        cut = b0 + np.searchsorted(dates[b0:b1], origin)
+        stop = b0 + np.searchsorted(dates[b0:b1], end)
+        if cut - b0 >= DEPTH + 1 and stop > cut:
+            out.append((g, b0, cut, stop))
+    return out
+
+
+def _segments_fold(model_name, fold, origin):
+    """
+    pool worker: one fold over every segment, the forest is fitted
+    once on all segments' rows before origin and rolls every segment
+    forward in lockstep, like /forecast/segmented/all
+    """
+    s = _data["series"]["segments"]
+    values, dates = s["values"], s["dates"]
+    origin = np.datetime64(origin)
+    end = origin + np.timedelta64(s["horizon"], "D")
+    slices = _segment_slices(s, origin, end)
+
+    start = time.perf_counter()
+    preds = []
+    if model_name == "rf":
+        train = np.flatnonzero(s["valid"] & (dates < origin))
+        model = _fit_rf(s["X"][train], values[train])
+        fitted = time.perf_counter()
+        # series skip days without orders, so steps are rows not days
+        steps = max(stop - cut for _, _, cut, stop in slices)
+        pred, _ = recursive_forecast(
+            model,
+            _data["feature_cols"],
+            np.vstack([values[cut - DEPTH:cut] for _, _, cut, _ in slices]),
+            [dates[cut - 1] for _, _, cut, _ in slices],
+            steps
+        )
+        preds = [pred[i, :stop - cut] for i, (_, _, cut, stop) in enumerate(slices)]
+    else:
+        fitted = start
+        fit_time = 0.0
+        order, seasonal_order = _data["sarima_orders"]["segments"]
+        for g, b0, cut, stop in slices:
+            if model_name == "sarima":
+                # gap-free daily history, the forecast is read at the order days
+                history = pd.Series(values[b0:cut], index=pd.DatetimeIndex(dates[b0:cut]))
+                history = history.asfreq("D", fill_value=0.0)
+                t0 = time.perf_counter()
+                fit = _fit(history, order, seasonal_order)
+                fit_time += time.perf_counter() - t0
+                days = ((dates[cut:stop] - dates[cut - 1]) // np.timedelta64(1, "D")).astype(np.int64)
+                preds.append(fit.forecast(steps=int(days.max())).to_numpy()[days - 1])
+            else:
+                preds.append(np.repeat(values[cut - 1], stop - cut))
+        fitted = start + fit_time
+    done = time.perf_counter()
+
+    actual = np.concatenate([values[cut:stop] for _, _, cut, stop in slices])
+    pred = np.concatenate(preds)
+    per_segment = {
+        int(g): [float(np.abs(p - values[cut:stop]).sum()), int(stop - cut)]
+        for (g, _, cut, stop), p in zip(slices, preds)
+    }
+    return {
+        "series": "segments",
+        "model": model_name,
+        "fold": fold,
+        "origin": str(pd.Timestamp(origin).date()),
+        "train_rows": int(sum(cut - b0 for _, b0, cut, _ in slices)),
+        "test_rows": len(actual),
+        "segments": len(slices),
+        **scores(actual, pred),
+        "fit_time_s": round(fitted - start, 4),
+        "predict_time_s": round(done - fitted, 4),
+        "per_segment": per_segment
+    }
+
+
+def _tasks(data, models, segment_models, folds=None):
+    for name, s in data["series"].items():
+        n_folds = folds or s["folds"]
+        if name == "segments":
+            last = s["dates"].max()
+            origins = [
+                last - np.timedelta64(s["horizon"] * k - 1, "D") for k in range(n_folds, 0, -1)
+            ]
+            for model_name in segment_models:
+                for fold, origin in enumerate(origins):
+                    yield _segments_fold, (model_name, fold, str(origin))
+        else:
+            origins = rolling_origins(len(s["values"]), n_folds, s["horizon"])
+            for model_name in models:
+                for fold, origin in enumerate(origins):
+                    yield _series_fold, (name, model_name, fold, origin)
+
+
+def summarize(results, data):
+    """
+    fold-averaged metrics and total fit/predict time per series and model
+    """
+    summary = []
+    segments = {}
+    groups = {}
+    for r in results:
+        groups.setdefault((r["series"], r["model"]), []).append(r)
+
+    for (name, model_name), rows in sorted(groups.items()):
+        ok = [r for r in rows if "error" not in r]
+        mapes = [r["mape"] for r in ok if r["mape"] is not None]
+        summary.append({
+            "series": name,
+            "model": model_name,
+            "folds": len(ok),
+            "failed": len(rows) - len(ok),
+            "mae": float(np.mean([r["mae"] for r in ok])) if ok else None,
+            "mape": float(np.mean(mapes)) if mapes else None,
+            "rmse": float(np.mean([r["rmse"] for r in ok])) if ok else None,
+            "fit_time_s": round(sum(r.get("fit_time_s", 0) for r in rows), 3),
+            "predict_time_s": round(sum(r.get("predict_time_s", 0) for r in rows), 3)
+        })
+
+        if name == "segments":
+            totals = {}
+            for r in ok:
+                for g, (abs_err, count) in r["per_segment"].items():
+                    t = totals.setdefault(g, [0.0, 0])
+                    t[0] += abs_err
+                    t[1] += count
+            keys = data["series"]["segments"]["keys"]
+            segments[model_name] = sorted(
+                (
+                    {**dict(zip(SEGMENT_COLS, keys[g])), "mae": abs_err / count, "test_rows": count}
+                    for g, (abs_err, count) in totals.items()
+                ),
+                key=lambda row: row["mae"]
+            )
+    return summary, segments
+
+
+def run(names=tuple(SERIES), models=MODELS, segment_models=SEGMENT_MODELS, jobs=None,
+        folds=None, trees=None, monthly_path=MONTHLY_PATH, daily_path=DAILY_PATH):
+    """
+    every (series, model, fold) runs as its own task on a process pool,
+    features are built once here and shared with the workers
+    """
+    feature_cols = DEFAULT_FEATURE_COLS
+    try:
+        feature_cols = list(model_registry.get_feature_cols())
+    except OSError:
+        pass
+
+    started = time.perf_counter()
+    data = prepare(names, feature_cols, monthly_path, daily_path)
+    data["rf_params"] = rf_params(trees)
+    data["sarima_orders"] = sarima_orders()
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=jobs or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(data,)
+    ) as pool:
+        futures = {pool.submit(fn, *args): args for fn, args in _tasks(data, models, segment_models, folds)}
+        for future in as_completed(futures):
+            args = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                name = args[0] if len(args) == 4 else "segments"
+                model_name = args[1] if len(args) == 4 else args[0]
+                result = {"series": name, "model": model_name, "fold": args[-2], "error": str(e)}
+            results.append(result)
+            if "error" in result:
+                print(f"{result['series']}/{result['model']} fold {result['fold']}: failed, {result['error']}")
+            else:
+                print(
+                    f"{result['series']}/{result['model']} fold {result['fold']} ({result['origin']}): "
+                    f"mae={result['mae']:.2f} fit={result['fit_time_s']}s predict={result['predict_time_s']}s"
+                )
+
+    results.sort(key=lambda r: (r["series"], r["model"], r["fold"]))
+    summary, segments = summarize(results, data)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "series": list(names),
+            "models": list(models),
+            "segment_models": list(segment_models),
+            "jobs": jobs or os.cpu_count(),
+            "rf_params": {k: v for k, v in data["rf_params"].items() if np.isscalar(v) or v is None},
+            "sarima_orders": data["sarima_orders"],
+            "feature_time_s": data["feature_time_s"],
+            "total_time_s": round(time.perf_counter() - started, 3)
+        },
+        "summary": summary,
+        "segments": segments,
+        "folds": [{k: v for k, v in r.items() if k != "per_segment"} for r in results]
+    }
+
+
+def _fmt(value, spec):
+    return format(value, spec) if value is not None else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecasting models")
+    parser.add_argument("--series", nargs="+", choices=list(SERIES), default=list(SERIES))
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--segment-models", nargs="+", choices=list(MODELS), default=list(SEGMENT_MODELS))
+    parser.add_argument("--folds", type=int, default=None, help="overrides the per-series fold count")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, defaults to all cores")
+    parser.add_argument("--trees", type=int, default=None, help="forest size per fold, defaults to the shipped model's")
+    parser.add_argument("--monthly", default=MONTHLY_PATH)
+    parser.add_argument("--daily", default=DAILY_PATH)
+    parser.add_argument("--out", default=REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.series, args.models, args.segment_models, args.jobs,
+        args.folds, args.trees, args.monthly, args.daily
+    )
+
+    print(f"\n{'series':<10}{'model':<8}{'folds':>6}{'MAE':>12}{'MAPE %':>10}{'RMSE':>12}{'fit s':>9}{'predict s':>11}")
+    for row in report["summary"]:
+        print(
+            f"{row['series']:<10}{row['model']:<8}{row['folds']:>6}{_fmt(row['mae'], '12.2f')}"
+            f"{_fmt(row['mape'], '10.1f')}{_fmt(row['rmse'], '12.2f')}"
+            f"{row['fit_time_s']:>9.2f}{row['predict_time_s']:>11.3f}"
+        )
+    print(f"total {report['meta']['total_time_s']}s")
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=1, default=str)
+    print("report written to:", args.out)
+
+
+if __name__ == "__main__":
+    main()
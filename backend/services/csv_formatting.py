@@ -1,24 +1,23 @@
 import pandas as pd
-import joblib
 from flask import jsonify
-import os
 
-from .sales_trend import compute_sales_trend
-from .kpi_dashboard import compute_kpis
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-MODEL_PATH = os.path.join(BASE_DIR, "models", "sales_forecast.pkl")
-FEATURE_COLS_PATH = os.path.join(BASE_DIR, "models", "feature_cols.pkl")
-
-model = joblib.load(MODEL_PATH)
-feature_cols = joblib.load(FEATURE_COLS_PATH)
+from .sales_trend import sales_analytics
+from . import model_registry
+from . import metrics
+from .horizon_forecast import horizon_error, recursive_forecast
+from .featureeng import feature_matrix
+from .result_cache import upload_cache, file_digest
+from .csv_loader import load_forecast_frame, date_report, upload_size
+from . import datasets
 
 #business insights
-def generate_business_insights(df, prediction):
+def generate_business_insights(stats, prediction):
+    """
+    stats is the series_stats of the sales series
+    """
     insights = []
-    avg_sales = df["sales"].mean()
-    rolling_avg = df["sales"].rolling(window=7, min_periods=1).mean().iloc[-1]
+    avg_sales = stats["mean"]
+    rolling_avg = stats["recent_mean_7"]
     if prediction > rolling_avg * 1.15:
         insights.append(
             "Forecasted demand is significantly higher than recent trends."
@@ -48,63 +47,145 @@ def generate_business_insights(df, prediction):
         )
 
     return insights
+def forecast_result(df, horizon=1):
+    """
+    the /forecast/csv response for a parsed upload frame,
+    raises ValueError when there is too little data
+    """
+    # rows whose date could not be parsed are left out and reported
+    dates = date_report(df)
+
+    if len(df) < 5:
+        raise ValueError("Insufficient data for prediction")
+    error = horizon_error(model_registry.rolling_closed(), horizon)
+    if error:
+        raise ValueError(error)
+
+    model = model_registry.get_predictor()
+    feature_cols = model_registry.get_feature_cols()
+
+    with metrics.stage("csv.features", rows=len(df)):
+        X, valid = feature_matrix(df["date"], df["sales"], feature_cols)
+        # rows with gaps in any uploaded column are still left out,
+        # sessions stored before the complete column kept every column
+        complete = df["complete"] if "complete" in df else df.notna().all(axis=1)
+        valid &= complete.to_numpy()
+        # a new frame, the cached one is never modified
+        df = df[valid]
+
+    if df.empty:
+        raise ValueError("Not enough data after feature engineering")
+
+    latest_row = pd.DataFrame(X[valid][-1:], columns=feature_cols)
+    #prediction
+    with metrics.stage("csv.predict", rows=1):
+        prediction = model.predict(latest_row)[0]
+    #trend analysis and kpis in one pass
+    with metrics.stage("csv.analytics", rows=len(df)):
+        analytics = sales_analytics(df)
+        insights = generate_business_insights(analytics["stats"], prediction)
+    expected_revenue = prediction
+    result = {
+        "predicted_sales": round(float(prediction), 2),
+        "expected_revenue": round(float(expected_revenue), 2),
+        "trend": analytics["trend"],
+        "kpis": analytics["kpis"],
+        "insights": insights,
+        "model_used": "Random Forest Regressor",
+        "disclaimer": "Predictions are based on historical sales patterns and may vary."
+    }
+    if dates and dates["bad_rows"]:
+        result["date_report"] = dates
+    if horizon > 1:
+        with metrics.stage("csv.horizon", rows=horizon):
+            future, future_dates = recursive_forecast(
+                model,
+                feature_cols,
+                df["sales"].to_numpy()[None, -3:],
+                df["date"].iloc[-1:],
+                horizon
+            )
+        result["forecast_horizon"] = {
+            "dates": [d[0].strftime("%Y-%m-%d") for d in future_dates],
+            "sales": [round(float(v), 2) for v in future[0]]
+        }
+    return result
+
+
+def dataset_forecast(dataset, horizon=1):
+    """
+    forecast_result of a stored dataset, shared with /forecast/csv
+    through the response cache (dataset ids are upload digests)
+    """
+    response_key = (dataset["id"], "forecast_csv", horizon, model_registry.model_version())
+    result = upload_cache.get(response_key)
+    if result is None:
+        result = forecast_result(datasets.view(dataset, "forecast"), horizon)
+        upload_cache.set(response_key, result)
+    return result
+
+
+def report_payload(data):
+    """
+    report input, a {"dataset_id": ...} body is expanded into the
+    forecast of that dataset, raises LookupError for unknown ids
+    """
+    dataset_id = (data or {}).get("dataset_id")
+    if not dataset_id:
+        return data
+    dataset = datasets.store.get(dataset_id)
+    if dataset is None:
+        raise LookupError(dataset_id)
+    horizon = min(max(int(data.get("horizon") or 1), 1), 365)
+    return dataset_forecast(dataset, horizon)
+
+
 def predict_from_csv(request):
     try:
+        # optional multi-step forecast beyond the next period
+        horizon = min(max(int(request.form.get("horizon") or 1), 1), 365)
+
+        dataset_id = datasets.requested_id(request)
+        if dataset_id is not None:
+            dataset = datasets.store.get(dataset_id)
+            if dataset is None:
+                return datasets.unknown(dataset_id)
+            try:
+                result = dataset_forecast(dataset, horizon)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            with metrics.stage("csv.jsonify"):
+                return jsonify(result)
+
         if "file" not in request.files:
             return jsonify({"error": "No file uploaded"}), 400
 
         file = request.files["file"]
-        df = pd.read_csv(file)
-        df.columns = df.columns.str.lower().str.strip()
-        date_col = next((c for c in df.columns if "date" in c), None)
-
-        if date_col is None or "sales" not in df.columns:
-            return jsonify({
-                "error": "CSV must contain a date column and a sales column"
-            }), 400
-
-        df = df.rename(columns={date_col: "date"})
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date", "sales"])
-        df = df.sort_values("date")
-
-        if len(df) < 5:
-            return jsonify({"error": "Insufficient data for prediction"}), 400
-        #trend analysis
-        trend_data = compute_sales_trend(df)
-
-        df["lag_1"] = df["sales"].shift(1)
-        df["lag_2"] = df["sales"].shift(2)
-        df["lag_3"] = df["sales"].shift(3)
-        df["rolling_mean_3"] = df["sales"].rolling(3).mean()
-        df["rolling_std_3"] = df["sales"].rolling(3).std()
-
-        df["year"] = df["date"].dt.year
-        df["month"] = df["date"].dt.month
-        df["quarter"] = df["date"].dt.quarter
-
-        df = df.dropna()
-
-        if df.empty:
-            return jsonify({"error": "Not enough data after feature engineering"}), 400
-
-        latest_row = df.iloc[-1][feature_cols].values.reshape(1, -1)
-        #prediction
-        prediction = model.predict(latest_row)[0]
-        #kpi
-        kpi_data = compute_kpis(df)
-        insights = generate_business_insights(df, prediction)
-        expected_revenue = prediction
-        trend_data=compute_sales_trend(df)
-        return jsonify({
-            "predicted_sales": round(float(prediction), 2),
-            "expected_revenue": round(float(expected_revenue), 2),
-            "trend": trend_data["trend"],
-            "kpis": kpi_data,
-            "insights": insights,
-            "model_used": "Random Forest Regressor",
-            "disclaimer": "Predictions are based on historical sales patterns and may vary."
-        })
+        with metrics.stage("csv.digest", nbytes=upload_size(file)):
+            digest = file_digest(file)
+
+        response_key = (digest, "forecast_csv", horizon, model_registry.model_version())
+        cached = upload_cache.get(response_key)
+        if cached is not None:
+            return jsonify(cached)
+
+        frame_key = (digest, "frame", "forecast_csv")
+        df = upload_cache.get(frame_key)
+        if df is None:
+            try:
+                df = load_forecast_frame(file)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            upload_cache.set(frame_key, df)
+
+        try:
+            result = forecast_result(df, horizon)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        upload_cache.set(response_key, result)
+        with metrics.stage("csv.jsonify"):
+            return jsonify(result)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
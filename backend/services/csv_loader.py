@@ -1,25 +1,113 @@
+import os
 import pandas as pd
 
-def load_base_csv(file):
-    df = pd.read_csv(file)
-    df.columns = (
-        df.columns
+from .date_parsing import DateParser
+from . import metrics
+
+SEGMENT_COLS = ["region", "category", "sub_category"]
+
+# uploads above this size go through the chunked reader
+STREAMING_THRESHOLD_BYTES = int(
+    os.environ.get("SPARKSALES_STREAMING_THRESHOLD", 64 * 1024 * 1024)
+)
+CHUNK_ROWS = 250_000
+
+
+def _normalize_columns(columns):
+    return (
+        pd.Index(columns)
         .str.strip()
         .str.lower()
         .str.replace(" ", "_")
         .str.replace("-", "_")
     )
+
+
+def _dataset_store():
+    # imported lazily, dataset_store builds on this module
+    from . import dataset_store
+    return dataset_store
+
+
+def date_report(df):
+    """
+    format and bad rows of the date column, as left by the loaders
+    """
+    return df.attrs.get("date_report")
+
+
+def load_base_csv(file, dayfirst=True):
+    """
+    dayfirst only decides between dd/mm and mm/dd when the dates
+    could be either, the format itself is inferred
+    """
+    store = _dataset_store()
+    if store.is_dataset(file):
+        return store.read_dataset(file)
+
+    df = pd.read_csv(file)
+    df.columns = _normalize_columns(df.columns)
     required = ["order_date", "sales"]
     for col in required:
         if col not in df.columns:
             raise ValueError(f"Missing required column: {col}")
         
-    df["order_date"] = pd.to_datetime(
-        df["order_date"], dayfirst=True, errors="coerce"
-    )
+    parser = DateParser(dayfirst=dayfirst)
+    df["order_date"] = parser.parse(df["order_date"])
 
     df = df.dropna(subset=["order_date"])
+    df.attrs["date_report"] = parser.report()
+
+    return df
+
+
+def _forecast_lines(chunk, parser):
+    """
+    date, sales and whether every uploaded column is filled,
+    for the order lines of one chunk that have a date and a sales value
+    """
+    chunk.columns = chunk.columns.str.lower().str.strip()
+    date_col = next((c for c in chunk.columns if "date" in c), None)
+
+    if date_col is None or "sales" not in chunk.columns:
+        raise ValueError("CSV must contain a date column and a sales column")
+
+    with metrics.stage("csv.parse_dates", rows=len(chunk)):
+        dates = parser.parse(chunk[date_col])
+    lines = pd.DataFrame({
+        "date": dates,
+        "sales": chunk["sales"],
+        "complete": chunk.notna().all(axis=1)
+    })
+    return lines.dropna(subset=["date", "sales"])
+
+
+def load_forecast_frame(file):
+    """
+    the order lines behind /forecast/csv sorted by date, complete
+    marks lines without gaps in any uploaded column
 
+    large uploads are read in chunks, only these three columns are
+    kept from each, so kpis and insights mean the same at any size
+    """
+    size = upload_size(file)
+    parser = DateParser(dayfirst=False)
+
+    if size > STREAMING_THRESHOLD_BYTES:
+        with metrics.stage("csv.read_stream", nbytes=size) as s:
+            parts = [_forecast_lines(chunk, parser) for chunk in pd.read_csv(file, chunksize=CHUNK_ROWS)]
+            if not parts:
+                raise ValueError("CSV must contain a date column and a sales column")
+            df = pd.concat(parts)
+            s.rows = len(df)
+    else:
+        with metrics.stage("csv.read_csv", nbytes=size) as s:
+            df = pd.read_csv(file)
+            s.rows = len(df)
+        df = _forecast_lines(df, parser)
+
+    df = df.sort_values("date")
+    df.attrs["date_report"] = parser.report()
     return df
 
 
@@ -29,6 +117,10 @@ def load_dashboard_view(df):
     - Analytics dashboard
     - SARIMA
     """
+    store = _dataset_store()
+    if store.is_dataset(df):
+        df = store.read_dataset(df, columns=["order_date", "sales"])
+
     return (
         df.groupby("order_date", as_index=False)["sales"]
         .sum()
@@ -36,23 +128,87 @@ def load_dashboard_view(df):
     )
 
 
-def load_segmented_view(df, region=None, category=None, sub_category=None):
+def upload_size(file):
     """
-    for product-wise / segmented analysis
+    size in bytes of an uploaded file or a path
     """
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+    stream = getattr(file, "stream", file)
+    pos = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(pos)
+    return size
 
-    required_cols = ["region", "category", "sub_category"]
-    for col in required_cols:
-        if col not in df.columns:
-            raise ValueError(f"Missing required segmentation column: {col}")
 
-    df_seg = df.copy()
+def load_daily_csv(file, chunksize=CHUNK_ROWS, dayfirst=True):
+    """
+    streaming alternative to load_base_csv for large uploads,
+    reads only the date/sales/segment columns chunk by chunk and keeps
+    daily totals per segment, so memory follows dates x segments
+    rather than the number of order lines
+    """
+    stream = file if isinstance(file, (str, os.PathLike)) else getattr(file, "stream", file)
+    if not isinstance(stream, (str, os.PathLike)):
+        stream.seek(0)
+
+    header = pd.read_csv(stream, nrows=0).columns
+    if not isinstance(stream, (str, os.PathLike)):
+        stream.seek(0)
+
+    names = dict(zip(_normalize_columns(header), header))
+    if "order_date" in names:
+        date_col = "order_date"
+    else:
+        date_col = next((c for c in names if "date" in c), None)
+
+    if date_col is None or "sales" not in names:
+        raise ValueError("CSV must contain a date column and a sales column")
+
+    segments = [c for c in SEGMENT_COLS if c in names]
+    keys = ["order_date"] + segments
+    wanted = [date_col, "sales"] + segments
+
+    dtypes = {names[date_col]: str, names["sales"]: "float64"}
+    dtypes.update({names[c]: "category" for c in segments})
+
+    # one parser for all chunks, repeated dates are only parsed once
+    parser = DateParser(dayfirst=dayfirst)
+    partials = []
+    reader = pd.read_csv(
+        stream,
+        usecols=[names[c] for c in wanted],
+        dtype=dtypes,
+        chunksize=chunksize
+    )
+    for chunk in reader:
+        chunk.columns = _normalize_columns(chunk.columns)
+        chunk = chunk.rename(columns={date_col: "order_date"})
+        chunk["order_date"] = parser.parse(chunk["order_date"])
+        chunk = chunk.dropna(subset=["order_date"])
+
+        partials.append(
+            chunk.groupby(keys, observed=True, dropna=False, sort=False)["sales"].sum()
+        )
+
+        # fold partial sums together so they never outgrow the daily table
+        if len(partials) >= 8:
+            partials = [_combine(partials, keys)]
+
+    if not partials:
+        daily = pd.DataFrame(columns=keys + ["sales"])
+        daily.attrs["date_report"] = parser.report()
+        return daily
+
+    daily = _combine(partials, keys).reset_index()
+    for col in segments:
+        daily[col] = daily[col].astype(object)
+    daily = daily.sort_values(keys).reset_index(drop=True)
+    daily.attrs["date_report"] = parser.report()
+    return daily
 
-    if region:
-        df_seg = df_seg[df_seg["region"] == region]
-    if category:
-        df_seg = df_seg[df_seg["category"] == category]
-    if sub_category:
-        df_seg = df_seg[df_seg["sub_category"] == sub_category]
 
-    return df_seg
\ No newline at end of file
+def _combine(partials, keys):
+    combined = pd.concat(partials)
+    return combined.groupby(level=keys, observed=True, dropna=False, sort=False).sum()
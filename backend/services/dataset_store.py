@@ -0,0 +1,118 @@
+import os
+import json
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .csv_loader import load_base_csv, date_report, SEGMENT_COLS
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STORE_DIR = os.path.join(PROJECT_ROOT, "data", "store")
+
+STORE_COLS = ["order_date", "sales"] + SEGMENT_COLS
+
+
+def index_path(path):
+    return os.path.splitext(path)[0] + ".index.json"
+
+
+def is_dataset(obj):
+    return isinstance(obj, (str, os.PathLike)) and str(obj).endswith(".parquet")
+
+
+def ingest_csv(src, dest=None, dayfirst=True):
+    """
+    converts a sales CSV once into Parquet: typed dates and sales,
+    dictionary-encoded segments, one row group per segment and a
+    sidecar index mapping each segment to its row range
+    """
+    if dest is None:
+        name = os.path.splitext(os.path.basename(str(src)))[0]
+        dest = os.path.join(STORE_DIR, f"{name}.parquet")
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+
+    df = load_base_csv(src, dayfirst=dayfirst)
+    dates = date_report(df)
+    segments = [c for c in SEGMENT_COLS if c in df.columns]
+    df = df[["order_date", "sales"] + segments]
+    df["sales"] = pd.to_numeric(df["sales"], errors="coerce").astype("float64")
+    for col in segments:
+        df[col] = df[col].astype("category")
+
+    df = df.sort_values(segments + ["order_date"], kind="stable").reset_index(drop=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    groups = [((), df)] if not segments else df.groupby(segments, observed=True, sort=False, dropna=False)
+    index = {
+        "columns": list(df.columns),
+        "segments_cols": segments,
+        "rows": len(df),
+        "date_report": dates,
+        "segments": []
+    }
+
+    tmp = dest + ".tmp"
+    with pq.ParquetWriter(tmp, table.schema) as writer:
+        row_group = 0
+        for key, part in groups:
+            start, stop = int(part.index[0]), int(part.index[-1]) + 1
+            writer.write_table(table.slice(start, stop - start), row_group_size=stop - start)
+            key = key if isinstance(key, tuple) else (key,)
+            index["segments"].append({
+                **{col: (None if pd.isna(v) else str(v)) for col, v in zip(segments, key)},
+                "row_group": row_group,
+                "start": start,
+                "stop": stop
+            })
+            row_group += 1
+    os.replace(tmp, dest)
+
+    with open(index_path(dest), "w") as f:
+        json.dump(index, f, indent=1)
+
+    return dest
+
+
+def load_index(path):
+    with open(index_path(path)) as f:
+        return json.load(f)
+
+
+def read_dataset(path, columns=None, region=None, category=None, sub_category=None):
+    """
+    reads only the requested columns, and only the row groups of the
+    matching segments, from a memory-mapped Parquet dataset
+    """
+    index = load_index(path)
+    columns = [c for c in (columns or index["columns"]) if c in index["columns"]]
+    wanted = {"region": region, "category": category, "sub_category": sub_category}
+
+    pf = pq.ParquetFile(path, memory_map=True)
+    if all(v is None for v in wanted.values()):
+        table = pf.read(columns=columns)
+    else:
+        groups = [
+            seg["row_group"] for seg in index["segments"]
+            if all(v is None or seg.get(col) == v for col, v in wanted.items())
+        ]
+        if not groups:
+            return pd.DataFrame({c: pd.Series(dtype=object) for c in columns})
+        table = pf.read_row_groups(groups, columns=columns)
+
+    return table.to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert sales CSVs into the columnar store")
+    parser.add_argument("csv", nargs="+")
+    parser.add_argument(
+        "--dayfirst",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="read ambiguous dates (every day <= 12) as dd/mm, the format itself is inferred"
+    )
+    args = parser.parse_args()
+
+    for src in args.csv:
+        print("stored:", ingest_csv(src, dayfirst=args.dayfirst))
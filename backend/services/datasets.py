@@ -0,0 +1,286 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+import joblib
+from flask import jsonify
+
+from .csv_loader import load_forecast_frame, date_report, upload_size
+from .segment_cube import cube_from_upload
+from .sales_trend import sales_analytics
+from .result_cache import file_digest, nbytes
+from . import metrics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATASET_DIR = os.environ.get("SPARKSALES_DATASET_DIR", os.path.join(BASE_DIR, "data", "sessions"))
+# parsed datasets kept in memory, the rest are read back from DATASET_DIR
+MAX_MEMORY_BYTES = int(float(os.environ.get("SPARKSALES_DATASET_MEMORY_MB", 512)) * 1024 * 1024)
+# seconds since last use after which a dataset is deleted
+DATASET_TTL = float(os.environ.get("SPARKSALES_DATASET_TTL", 24 * 3600))
+
+# dataset ids are the sha256 of the upload
+_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DatasetStore:
+    """
+    parsed uploads by id, an LRU bounded by bytes in memory and
+    written through to disk, so an evicted dataset (or one ingested by
+    another worker process) is read back instead of re-uploaded
+    """
+
+    def __init__(self, directory=DATASET_DIR, max_bytes=MAX_MEMORY_BYTES, ttl=DATASET_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_loads = 0
+        self.spills = 0
+        self.expirations = 0
+
+    def _path(self, dataset_id):
+        return os.path.join(self.directory, f"{dataset_id}.joblib")
+
+    def _insert(self, dataset):
+        old = self._data.pop(dataset["id"], None)
+        if old is not None:
+            self._bytes -= old["nbytes"]
+        self._data[dataset["id"]] = dataset
+        self._bytes += dataset["nbytes"]
+        # the newest dataset always stays, even when it alone is over the limit
+        while self._bytes > self.max_bytes and len(self._data) > 1:
+            _, evicted = self._data.popitem(last=False)
+            self._bytes -= evicted["nbytes"]
+            self.spills += 1
+
+    def put(self, dataset):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(dataset["id"])
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(dataset, tmp)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._insert(dataset)
+        self.expire()
+
+    def get(self, dataset_id):
+        if not dataset_id or not _ID.match(dataset_id):
+            return None
+
+        with self._lock:
+            dataset = self._data.get(dataset_id)
+            if dataset is not None:
+                self._data.move_to_end(dataset_id)
+                self.hits += 1
+
+        path = self._path(dataset_id)
+        if dataset is None:
+            if not os.path.exists(path) or self._expired(path):
+                return None
+            with metrics.stage("datasets.load", nbytes=os.path.getsize(path)):
+                dataset = joblib.load(path)
+            with self._lock:
+                self._insert(dataset)
+                self.disk_loads += 1
+
+        try:
+            # the ttl counts from last use
+            os.utime(path)
+        except OSError:
+            pass
+        return dataset
+
+    def delete(self, dataset_id):
+        if not dataset_id or not _ID.match(dataset_id):
+            return False
+        with self._lock:
+            dataset = self._data.pop(dataset_id, None)
+            if dataset is not None:
+                self._bytes -= dataset["nbytes"]
+        try:
+            os.remove(self._path(dataset_id))
+        except OSError:
+            return dataset is not None
+        return True
+
+    def _expired(self, path):
+        try:
+            return time.time() - os.path.getmtime(path) > self.ttl
+        except OSError:
+            return True
+
+    def expire(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".joblib") and self._expired(path):
+                dataset_id = name[:-len(".joblib")]
+                with self._lock:
+                    dataset = self._data.pop(dataset_id, None)
+                    if dataset is not None:
+                        self._bytes -= dataset["nbytes"]
+                try:
+                    os.remove(path)
+                    self.expirations += 1
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_memory": len(self._data),
+                "memory_bytes": self._bytes,
+                "max_memory_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "disk_loads": self.disk_loads,
+                "spills": self.spills,
+                "expirations": self.expirations
+            }
+
+
+store = DatasetStore()
+
+
+def _rewind(file):
+    getattr(file, "stream", file).seek(0)
+
+
+def ingest(file, filename=None):
+    """
+    parses an upload once into every view the endpoints need, returns
+    (dataset, created), uploading the same file again returns the
+    existing dataset
+    """
+    with metrics.stage("datasets.digest", nbytes=upload_size(file)):
+        dataset_id = file_digest(file)
+    dataset = store.get(dataset_id)
+    if dataset is not None:
+        return dataset, False
+
+    views, errors = {}, {}
+    # /forecast/csv frame and the segment cube, each built the way the
+    # file endpoints build it so results match a direct upload
+    for name, build in (("forecast", load_forecast_frame), ("segments", cube_from_upload)):
+        _rewind(file)
+        try:
+            views[name] = build(file)
+        except ValueError as e:
+            errors[name] = str(e)
+    _rewind(file)
+
+    if not views:
+        raise ValueError(errors["forecast"])
+
+    frame = views.get("forecast")
+    cube = views.get("segments")
+    meta = {
+        "filename": filename,
+        "file_bytes": upload_size(file),
+        "created_at": time.time(),
+        "views": sorted(views),
+        "errors": errors,
+        "rows": len(frame) if frame is not None else None,
+        "segments": len(cube.segments) if cube is not None else None,
+        "date_report": date_report(frame) if frame is not None else cube.date_report
+    }
+    if frame is not None and len(frame):
+        meta["start_date"] = str(frame["date"].iloc[0].date())
+        meta["end_date"] = str(frame["date"].iloc[-1].date())
+
+    dataset = {
+        "id": dataset_id,
+        "meta": meta,
+        "views": views,
+        "nbytes": sum(nbytes(view) for view in views.values())
+    }
+    with metrics.stage("datasets.store", nbytes=dataset["nbytes"]):
+        store.put(dataset)
+    return dataset, True
+
+
+def view(dataset, name):
+    """
+    one parsed view of a dataset, raises ValueError when the upload
+    could not provide it (e.g. no segment columns)
+    """
+    if name not in dataset["views"]:
+        raise ValueError(dataset["meta"]["errors"].get(name, f"Dataset has no {name} view"))
+    return dataset["views"][name]
+
+
+def requested_id(request):
+    """
+    dataset_id from the form, the query string or a JSON body
+    """
+    dataset_id = request.form.get("dataset_id") or request.args.get("dataset_id")
+    if dataset_id is None and request.is_json:
+        dataset_id = (request.get_json(silent=True) or {}).get("dataset_id")
+    return dataset_id or None
+
+
+def unknown(dataset_id):
+    return jsonify({"error": f"Unknown or expired dataset: {dataset_id}"}), 404
+
+
+def create_dataset(request):
+    try:
+        if "file" not in request.files:
+            return jsonify({"error": "No file uploaded"}), 400
+
+        file = request.files["file"]
+        try:
+            dataset, created = ingest(file, file.filename)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"dataset_id": dataset["id"], **dataset["meta"]}), 201 if created else 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def dataset_info(dataset_id):
+    dataset = store.get(dataset_id)
+    if dataset is None:
+        return unknown(dataset_id)
+    return jsonify({"dataset_id": dataset["id"], **dataset["meta"]})
+
+
+def delete_dataset(dataset_id):
+    if not store.delete(dataset_id):
+        return unknown(dataset_id)
+    return jsonify({"dataset_id": dataset_id, "deleted": True})
+
+
+def dataset_trend(dataset_id):
+    """
+    monthly trend and kpis of a dataset without running the model
+    """
+    try:
+        dataset = store.get(dataset_id)
+        if dataset is None:
+            return unknown(dataset_id)
+        try:
+            df = view(dataset, "forecast")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        with metrics.stage("datasets.trend", rows=len(df)):
+            analytics = sales_analytics(df)
+        return jsonify({
+            "dataset_id": dataset_id,
+            "trend": analytics["trend"],
+            "monthly_kpis": analytics["monthly_kpis"],
+            "kpis": analytics["kpis"]
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
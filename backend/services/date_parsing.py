@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+# tried in order, the first that parses the whole sample wins
+CANDIDATE_FORMATS = (
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d-%m-%Y",
+    "%m-%d-%Y",
+    "%Y/%m/%d",
+    "%d.%m.%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%m/%d/%Y %H:%M",
+    "%Y%m%d",
+)
+SAMPLE_SIZE = 1000
+# share of the sample a format has to parse, the rest are bad rows
+MIN_MATCH = 0.9
+# distinct strings remembered by a DateParser across chunks
+MAX_CACHE = 200_000
+MAX_EXAMPLES = 5
+
+
+def _sample(uniques, size=SAMPLE_SIZE):
+    uniques = np.asarray(uniques, dtype=object)
+    if len(uniques) <= size:
+        return uniques
+    # spread over the whole column, not just its head
+    return uniques[np.linspace(0, len(uniques) - 1, size).astype(np.int64)]
+
+
+def infer_format(values, dayfirst=None, sample_size=SAMPLE_SIZE):
+    """
+    the candidate format that parses most of a sample of distinct
+    strings, None when none reaches MIN_MATCH
+
+    when the sample fits both day-first and month-first equally well
+    (every day <= 12) dayfirst picks between them
+    """
+    sample = pd.Series(_sample(pd.unique(pd.Series(values).dropna().astype(str)), sample_size))
+    if sample.empty:
+        return None
+
+    scores = {
+        fmt: pd.to_datetime(sample, format=fmt, errors="coerce").notna().mean()
+        for fmt in CANDIDATE_FORMATS
+    }
+    best = max(scores.values())
+    if best < MIN_MATCH:
+        return None
+
+    matches = [fmt for fmt in CANDIDATE_FORMATS if scores[fmt] == best]
+    if dayfirst is not None and len(matches) > 1:
+        preferred = "%d" if dayfirst else "%m"
+        matches.sort(key=lambda fmt: not fmt.startswith(preferred))
+    return matches[0]
+
+
+class DateParser:
+    """
+    parses date columns with one inferred format, only the distinct
+    strings are parsed and mapped back onto the rows, and they are
+    remembered so later chunks of the same upload only parse new ones
+
+    unparseable values become NaT and are counted in report()
+    """
+
+    def __init__(self, fmt=None, dayfirst=None):
+        self.fmt = fmt
+        self.dayfirst = dayfirst
+        self.rows = 0
+        self.bad_rows = 0
+        self.examples = []
+        self._cache = pd.Series(dtype="datetime64[ns]")
+
+    def _parse_unique(self, uniques):
+        if self.fmt is None:
+            self.fmt = infer_format(uniques, self.dayfirst)
+        if self.fmt is not None:
+            return pd.to_datetime(uniques, format=self.fmt, errors="coerce")
+        # no single format fits, fall back to per-value parsing of the uniques
+        return pd.to_datetime(
+            uniques, format="mixed", dayfirst=bool(self.dayfirst), errors="coerce"
+        )
+
+    def parse(self, values):
+        """
+        values as a datetime64 Series with the same index
+        """
+        values = pd.Series(values)
+        if pd.api.types.is_datetime64_any_dtype(values):
+            self.rows += len(values)
+            return values
+
+        codes, uniques = pd.factorize(values.astype("string"))
+        uniques = pd.Index(uniques.astype(object))
+
+        known = uniques.isin(self._cache.index)
+        new = uniques[~known]
+        if len(new):
+            parsed = pd.Series(
+                np.asarray(self._parse_unique(new.str.strip()), dtype="datetime64[ns]"),
+                index=new
+            )
+            if len(self._cache) + len(parsed) <= MAX_CACHE:
+                self._cache = pd.concat([self._cache, parsed])
+            lookup = pd.concat([self._cache[uniques[known]], parsed])
+        else:
+            lookup = self._cache
+
+        mapped = lookup.reindex(uniques).to_numpy(dtype="datetime64[ns]")
+        out = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]")
+        present = codes >= 0
+        out[present] = mapped[codes[present]]
+
+        self._record(values, out)
+        return pd.Series(out, index=values.index, name=values.name)
+
+    def _record(self, values, parsed):
+        bad = np.flatnonzero(np.isnat(parsed))
+        if len(bad) and len(self.examples) < MAX_EXAMPLES:
+            for i in bad[:MAX_EXAMPLES - len(self.examples)]:
+                value = values.iloc[i]
+                self.examples.append({
+                    "row": int(self.rows + i),
+                    "value": None if pd.isna(value) else str(value)
+                })
+        self.rows += len(values)
+        self.bad_rows += len(bad)
+
+    def report(self):
+        return {
+            "format": self.fmt,
+            "rows": self.rows,
+            "bad_rows": self.bad_rows,
+            "examples": self.examples
+        }
+
+
+def parse_dates(values, dayfirst=None, fmt=None):
+    """
+    one-shot helper, returns (parsed Series, report)
+    """
+    parser = DateParser(fmt=fmt, dayfirst=dayfirst)
+    return parser.parse(values), parser.report()
@@ -0,0 +1,203 @@
+import os
+import time
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# threads running CPU-bound service calls, shared by every endpoint
+CPU_WORKERS = int(os.environ.get("SPARKSALES_CPU_WORKERS", os.cpu_count() or 2))
+# processes for picklable work (PDF rendering), 0 keeps it on the threads
+PROCESS_WORKERS = int(os.environ.get("SPARKSALES_PROCESS_WORKERS", 0))
+# seconds a request waits for a free slot before it is refused with a 429
+QUEUE_TIMEOUT = float(os.environ.get("SPARKSALES_QUEUE_TIMEOUT", 30))
+
+# concurrent calls allowed per endpoint group, SPARKSALES_LIMIT_<NAME> overrides
+DEFAULT_LIMITS = {"csv": 2, "segmented": 2, "sarima": 2, "report": 2, "manual": 2}
+LIMITS = {
+    name: int(os.environ.get(f"SPARKSALES_LIMIT_{name.upper()}", limit))
+    for name, limit in DEFAULT_LIMITS.items()
+}
+
+
+class Busy(Exception):
+    pass
+
+
+class _Slots:
+    """
+    a bounded semaphore that also counts running and waiting calls
+    """
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout):
+        """
+        waits up to timeout seconds for a slot, forever when timeout is None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.running >= self.limit:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.rejected += 1
+                        raise Busy(f"{self.name}: {self.running} requests already running")
+                    self._cond.wait(remaining)
+                self.running += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.running -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "running": self.running,
+                "waiting": self.waiting,
+                "rejected": self.rejected
+            }
+
+
+_threads = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+# waits for slots on behalf of submit() callers, the work itself runs on _threads
+_background = ThreadPoolExecutor(thread_name_prefix="background")
+_processes = None
+_processes_lock = threading.Lock()
+_slots = {name: _Slots(name, limit) for name, limit in LIMITS.items()}
+
+
+class _Held:
+    """
+    a streamed response body that keeps its endpoint slot until it is
+    exhausted or closed, the work of a stream runs as it is read
+    """
+
+    def __init__(self, slots, body):
+        self._slots = slots
+        self._body = body
+        self._it = iter(body)
+        self._lock = threading.Lock()
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._it)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            close = getattr(self._body, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._slots.release()
+
+
+def _process_pool():
+    global _processes
+    with _processes_lock:
+        if _processes is None:
+            # spawned, not forked, the parent runs request and pool threads
+            _processes = ProcessPoolExecutor(
+                max_workers=PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _processes
+
+
+def _slot(name):
+    slots = _slots.get(name)
+    if slots is None:
+        slots = _slots.setdefault(name, _Slots(name, CPU_WORKERS))
+    return slots
+
+
+def run(name, fn, *args, **kwargs):
+    """
+    calls fn on the shared CPU thread pool under name's concurrency
+    limit and waits for the result, raises Busy when no slot frees up
+    within QUEUE_TIMEOUT
+
+    the caller's context variables go along, so Flask's request, g and
+    jsonify work inside fn as they would in the view
+
+    a streamed response keeps the slot until its body has been read
+    """
+    slots = _slot(name)
+    slots.acquire(QUEUE_TIMEOUT)
+    try:
+        ctx = contextvars.copy_context()
+        result = _threads.submit(ctx.run, fn, *args, **kwargs).result()
+    except BaseException:
+        slots.release()
+        raise
+
+    if getattr(result, "is_streamed", False):
+        result.response = _Held(slots, result.response)
+    else:
+        slots.release()
+    return result
+
+
+def submit(name, fn, *args, **kwargs):
+    """
+    background version of run(), returns a Future at once; the call
+    queues for a slot under name's limit without a timeout, so it
+    shares that limit with run() callers of the same name
+    """
+    slots = _slot(name)
+
+    def call():
+        slots.acquire(None)
+        try:
+            return _threads.submit(fn, *args, **kwargs).result()
+        finally:
+            slots.release()
+
+    return _background.submit(call)
+
+
+def run_in_process(name, fn, *args, **kwargs):
+    """
+    like run() but in a worker process when PROCESS_WORKERS > 0,
+    fn and its arguments must be picklable and must not touch the request
+    """
+    if PROCESS_WORKERS <= 0:
+        return run(name, fn, *args, **kwargs)
+
+    slots = _slot(name)
+    slots.acquire(QUEUE_TIMEOUT)
+    try:
+        return _process_pool().submit(fn, *args, **kwargs).result()
+    finally:
+        slots.release()
+
+
+def stats():
+    return {
+        "cpu_workers": CPU_WORKERS,
+        "process_workers": PROCESS_WORKERS,
+        "queue_timeout_s": QUEUE_TIMEOUT,
+        "endpoints": {name: slots.stats() for name, slots in _slots.items()}
+    }
@@ -1,5 +1,10 @@
+import numpy as np
 import pandas as pd
 
+LAGS = (1, 2, 3)
+WINDOW = 3
+
+
 def create_time_features(df, date_col="order_date"):
     if date_col not in df.columns:
         raise ValueError(f"{date_col} not found in dataframe")
@@ -13,14 +18,185 @@ def create_time_features(df, date_col="order_date"):
     return df
 
 
-def create_lag_features(df, target="sales", lags=(1, 2, 3)):
+def create_lag_features(df, target="sales", lags=LAGS):
     if target not in df.columns:
         raise ValueError(f"{target} not found in dataframe")
 
-    for lag in lags:
-        df[f"lag_{lag}"] = df[target].shift(lag)
+    features = lag_features(df[target].to_numpy(), lags)
+    for name, col in features.items():
+        df[name] = col
+
+    return df
+
+
+def _positions(n, starts=None):
+    """
+    index of every row within its own series, starts holds the
+    first row of each series in a sorted, concatenated array
+    """
+    pos = np.arange(n)
+    if starts is None or len(starts) == 0:
+        return pos
+    starts = np.asarray(starts, dtype=np.int64)
+    return pos - np.repeat(starts, np.diff(np.append(starts, n)))
+
+
+def warmup(lags=LAGS, window=WINDOW, closed="right"):
+    """
+    rows at the start of a series without a full set of features
+    """
+    return max(max(lags), window - 1 if closed == "right" else window)
+
+
+def valid_rows(n, starts=None, lags=LAGS, window=WINDOW, closed="right"):
+    return _positions(n, starts) >= warmup(lags, window, closed)
+
+
+def _moments(total, squares, count):
+    """
+    mean and sample std (ddof=1) from window sums and sums of squares
+    """
+    mean = total / count
+    var = (squares - total * mean) / (count - 1)
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
+
+def lag_features(values, lags=LAGS, window=WINDOW, starts=None, closed="right"):
+    """
+    lag_k, rolling_mean and rolling_std over the current value and
+    the window - 1 before it, in one pass over a contiguous float64
+    array using sliding-window sums and sums of squares
+
+    closed="left" takes the window over the values before the current
+    one instead, like pandas rolling(closed="left"), which is the
+    window next_features builds when forecasting the next period
+
+    with starts set, series are concatenated in sorted order and no
+    value leaks across a series boundary, rows without a full window
+    are NaN like pandas shift/rolling
+    """
+    if closed not in ("right", "left"):
+        raise ValueError(f"closed must be 'right' or 'left', got {closed!r}")
+
+    x = np.ascontiguousarray(values, dtype=np.float64)
+    n = len(x)
+    pos = _positions(n, starts)
+
+    out = {}
+    for k in lags:
+        col = np.full(n, np.nan)
+        col[k:] = x[:n - k]
+        col[pos < k] = np.nan
+        out[f"lag_{k}"] = col
+
+    sq = x * x
+    total = x.copy()
+    squares = sq.copy()
+    for k in range(1, window):
+        total[k:] += x[:n - k]
+        squares[k:] += sq[:n - k]
+
+    mean, std = _moments(total, squares, window)
+    if closed == "left":
+        mean = np.r_[np.nan, mean[:-1]]
+        std = np.r_[np.nan, std[:-1]]
+    short = pos < warmup((0,), window, closed)
+    mean[short] = np.nan
+    std[short] = np.nan
+
+    out[f"rolling_mean_{window}"] = mean
+    out[f"rolling_std_{window}"] = std
+    return out
+
+
+def period_features(dates):
+    dates = pd.DatetimeIndex(dates)
+    return {
+        "year": dates.year.to_numpy(),
+        "month": dates.month.to_numpy(),
+        "quarter": dates.quarter.to_numpy()
+    }
+
+
+def series_starts(codes):
+    """
+    first row of every run of equal codes in a sorted array
+    """
+    codes = np.asarray(codes)
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+
+def grouped_lag_features(df, keys, date_col="order_date", target="sales", freq="D",
+                         lags=LAGS, window=WINDOW, closed="right"):
+    """
+    per-series features for a frame that mixes many segments, order
+    lines are first summed to (segment, period) so lag_1 is the
+    previous period of the same series and not a neighbouring row,
+    then all groups are handled in one pass over their sorted offsets
+
+    returns the aggregated frame with the feature columns and the
+    start offset of each group
+    """
+    keys = list(keys)
+    periods = df[date_col].dt.to_period(freq).dt.to_timestamp()
+
+    agg = (
+        df[keys + [target]]
+        .assign(**{date_col: periods})
+        .groupby(keys + [date_col], sort=True, observed=True, dropna=False)[target]
+        .sum()
+        .reset_index()
+    )
+
+    codes = agg.groupby(keys, sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    starts = series_starts(codes)
+
+    for name, col in lag_features(agg[target].to_numpy(), lags, window, starts, closed).items():
+        agg[name] = col
+    for name, col in period_features(agg[date_col]).items():
+        agg[name] = col
+
+    return agg, starts
+
+
+def _assemble(columns, feature_cols, n):
+    X = np.empty((n, len(feature_cols)), dtype=np.float64)
+    for j, col in enumerate(feature_cols):
+        X[:, j] = columns[col]
+    return X
+
+
+def feature_matrix(dates, values, feature_cols, starts=None, lags=LAGS, window=WINDOW,
+                   closed="right"):
+    """
+    the model input for every row of one or more sorted series, columns
+    in feature_cols order, plus the mask of rows with complete features
+    """
+    n = len(values)
+    columns = lag_features(values, lags, window, starts, closed)
+    columns.update(period_features(dates))
+    return _assemble(columns, feature_cols, n), valid_rows(n, starts, lags, window, closed)
+
 
-    df["rolling_mean_3"] = df[target].rolling(3, min_periods=1).mean()
-    df["rolling_std_3"] = df[target].rolling(3, min_periods=1).std()
+def next_features(history, periods, feature_cols, lags=LAGS, window=WINDOW):
+    """
+    the model input for the period after each row of history
+    (n_series, >= max lag, oldest first), the latest known values
+    become the lags and the rolling window
+    """
+    h = np.ascontiguousarray(history, dtype=np.float64)
+    if h.ndim == 1:
+        h = h[None, :]
+    n = len(h)
 
-    return df
\ No newline at end of file
+    columns = {f"lag_{k}": h[:, -k] for k in lags}
+    tail = h[:, -window:]
+    columns[f"rolling_mean_{window}"], columns[f"rolling_std_{window}"] = _moments(
+        tail.sum(axis=1),
+        (tail * tail).sum(axis=1),
+        window
+    )
+    columns.update(periods)
+    return _assemble(columns, feature_cols, n)
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+
+# batches up to this many rows walk all trees at once in NumPy, larger
+# ones go tree by tree through sklearn's compiled Tree.predict
+VECTOR_MAX_ROWS = int(os.environ.get("SPARKSALES_FOREST_VECTOR_ROWS", 32))
+CHUNK_ROWS = 256
+
+
+class CompiledForest:
+    """
+    a fitted forest regressor flattened into node arrays
+
+    feature, threshold and value per node plus one child array where
+    child[2 * node + go_right] is the next node, leaves point to
+    themselves so every (row, tree) pair can take max_depth steps in
+    lockstep without branching
+
+    predict() skips sklearn's input validation and joblib dispatch,
+    which is most of the cost of scoring a single row
+    """
+
+    def __init__(self, model):
+        trees = [est.tree_ for est in model.estimators_]
+        counts = np.array([t.node_count for t in trees])
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+        shift = np.repeat(offsets, counts)
+        left = np.concatenate([t.children_left for t in trees])
+        right = np.concatenate([t.children_right for t in trees])
+        leaf = left == -1
+        nodes = np.arange(len(left))
+
+        left = left + shift
+        right = right + shift
+        left[leaf] = nodes[leaf]
+        right[leaf] = nodes[leaf]
+
+        self.feature = np.concatenate([t.feature for t in trees]).astype(np.int32)
+        self.feature[leaf] = 0
+        # leaves compare against +inf so go_right is always False there
+        self.threshold = np.concatenate([t.threshold for t in trees])
+        self.threshold[leaf] = np.inf
+        self.child = np.stack([left, right], axis=1).ravel().astype(np.int32)
+        self.value = np.concatenate([t.value[:, 0, 0] for t in trees])
+        self.roots = offsets.astype(np.int32)
+        self.depth = max(t.max_depth for t in trees)
+
+        self.trees = trees
+        self.model = model
+        self.n_features = model.n_features_in_
+        names = getattr(model, "feature_names_in_", None)
+        self.feature_names = list(names) if names is not None else None
+
+    @staticmethod
+    def supports(model):
+        return (
+            hasattr(model, "estimators_")
+            and getattr(model, "n_outputs_", None) == 1
+            and not hasattr(model, "classes_")
+            and all(hasattr(est, "tree_") for est in model.estimators_)
+        )
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.child, self.value, self.roots))
+
+    def _ordered(self, X):
+        if hasattr(X, "columns") and self.feature_names is not None:
+            return X[self.feature_names]
+        return X
+
+    def _matrix(self, X):
+        X = self._ordered(X)
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, the model expects {self.n_features}")
+        return X
+
+    def _predict_vector(self, X):
+        n, f = X.shape
+        n_trees = len(self.roots)
+        out = np.empty(n)
+
+        for start in range(0, n, CHUNK_ROWS):
+            block = X[start:start + CHUNK_ROWS]
+            k = len(block)
+            flat = block.ravel()
+
+            node = np.tile(self.roots, k)
+            row = np.repeat(np.arange(k, dtype=np.int32) * f, n_trees)
+            for _ in range(self.depth):
+                go_right = flat[row + self.feature[node]] > self.threshold[node]
+                node = self.child[2 * node + go_right]
+
+            out[start:start + k] = self.value[node].reshape(k, n_trees).mean(axis=1)
+        return out
+
+    def _predict_trees(self, X):
+        # same accumulation order as RandomForestRegressor.predict
+        out = np.zeros(len(X))
+        for tree in self.trees:
+            out += tree.predict(X)[:, 0]
+        return out / len(self.trees)
+
+    def predict(self, X):
+        matrix = self._matrix(X)
+        if np.isnan(matrix).any():
+            # missing-value routing is left to sklearn, given a frame
+            # when the caller passed one so it still checks the names
+            return self.model.predict(self._ordered(X) if hasattr(X, "columns") else matrix)
+        if len(matrix) <= VECTOR_MAX_ROWS:
+            return self._predict_vector(matrix)
+        return self._predict_trees(matrix)
+
+
+def compile_forest(model):
+    """
+    CompiledForest for supported forests, None for anything else
+    """
+    return CompiledForest(model) if CompiledForest.supports(model) else None
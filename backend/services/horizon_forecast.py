@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from .featureeng import LAGS, WINDOW, next_features, period_features
+
+# the rolling window next_features builds, over the periods before the
+# one forecast; models rolled forward here must be trained on it
+SERVED_CLOSED = "left"
+
+
+def horizon_error(closed, steps):
+    """
+    why a model trained on `closed` rolling windows cannot be rolled
+    `steps` ahead, None when it can; a right-closed forest (the notebook
+    model) was fitted with its target inside rolling_mean_3, which no
+    forecast can supply, and its errors compound step over step
+    """
+    if steps > 1 and closed != SERVED_CLOSED:
+        return (
+            f"The global model was trained on {closed}-closed rolling windows and cannot "
+            "forecast more than one period ahead, retrain it with "
+            "python -m backend.services.train_forest"
+        )
+    return None
+
+
+def recursive_forecast(model, feature_cols, history, last_dates, steps, freq="D"):
+    """
+    N-step recursive forecast for many series in lockstep
+
+    history    - (n_series, >= 3) latest values per series, oldest first
+    last_dates - last observed period of each series
+    each step scores every series with a single predict call, then
+    feeds the predictions back into lag_1..3 and the rolling window
+    and advances year/month/quarter
+
+    the model must be trained on SERVED_CLOSED windows, see horizon_error
+    """
+    depth = max(max(LAGS), WINDOW)
+    window = np.asarray(history, dtype=np.float64)[:, -depth:]
+    if window.shape[1] < depth:
+        raise ValueError(f"At least {depth} observations per series are required")
+
+    dates = pd.DatetimeIndex(last_dates)
+    offset = to_offset(freq)
+
+    predictions = np.empty((len(window), steps), dtype=np.float64)
+    horizon_dates = []
+
+    for h in range(steps):
+        dates = dates + offset
+        # the window of the next period is made of the known lags
+        X = pd.DataFrame(
+            next_features(window, period_features(dates), feature_cols),
+            columns=feature_cols
+        )
+
+        step = model.predict(X)
+        predictions[:, h] = step
+        horizon_dates.append(dates)
+
+        window = np.column_stack([window[:, 1:], step])
+
+    return predictions, horizon_dates
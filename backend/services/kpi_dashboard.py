@@ -1,21 +1,40 @@
 import numpy as np
 
-def compute_kpis(df):
+
+def series_stats(sales):
     """
-     KPI metrics
+    one pass over a sales series: count, total, mean, sample std,
+    the two latest values and the mean of the last 7 periods
     """
+    x = np.asarray(sales, dtype=np.float64)
+    n = len(x)
+    total = float(x.sum())
+    mean = total / n if n else float("nan")
+    std = float(np.sqrt(((x - mean) ** 2).sum() / (n - 1))) if n > 1 else float("nan")
+
+    return {
+        "count": n,
+        "total": total,
+        "mean": mean,
+        "std": std,
+        "latest": float(x[-1]) if n else float("nan"),
+        "previous": float(x[-2]) if n > 1 else float("nan"),
+        "recent_mean_7": float(x[-7:].mean()) if n else float("nan")
+    }
+
 
-    total_sales = df["sales"].sum()
-    avg_sales = df["sales"].mean()
-    latest_sales = df["sales"].iloc[-1]
+def kpis_from_stats(stats):
+    total_sales = stats["total"]
+    avg_sales = stats["mean"]
+    latest_sales = stats["latest"]
 
-    if len(df) > 1:
-        prev = df["sales"].iloc[-2]
+    if stats["count"] > 1:
+        prev = stats["previous"]
         sales_growth_pct = ((latest_sales - prev) / prev) * 100 if prev != 0 else 0
     else:
         sales_growth_pct = 0
 
-    std_dev = df["sales"].std()
+    std_dev = stats["std"]
     volatility_ratio = std_dev / avg_sales if avg_sales != 0 else 0
 
     if volatility_ratio > 0.35:
@@ -32,3 +51,10 @@ def compute_kpis(df):
         "sales_growth_pct": round(float(sales_growth_pct), 2),
         "volatility_level": volatility_level
     }
+
+
+def compute_kpis(df):
+    """
+     KPI metrics
+    """
+    return kpis_from_stats(series_stats(df["sales"].to_numpy()))
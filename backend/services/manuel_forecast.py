@@ -1,62 +1,204 @@
-import joblib
+import json
+import numpy as np
 import pandas as pd
-import os
+from flask import Response, jsonify, stream_with_context
 
+from . import model_registry
+from . import metrics
+from .featureeng import next_features
+from .csv_loader import SEGMENT_COLS
+from .model_bank import bank
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_SIZE = 10000
+LAG_FIELDS = ("lag_1", "lag_2", "lag_3")
+PERIOD_FIELDS = ("year", "month", "quarter")
 
-MODEL_PATH = os.path.join(BASE_DIR, "models", "sales_forecast.pkl")
-FEATURE_COLS_PATH = os.path.join(BASE_DIR, "models", "feature_cols.pkl")
-
-model = joblib.load(MODEL_PATH)
-feature_cols = joblib.load(FEATURE_COLS_PATH)
 #sales prediction
 def predict_sales(input_data):
     try:
-        l1 = float(input_data.get("lag_1", 0))
-        l2 = float(input_data.get("lag_2", 0))
-        l3 = float(input_data.get("lag_3", 0))
-
-        year = int(input_data.get("year", 0))
-        month = int(input_data.get("month", 0))
-        quarter = int(input_data.get("quarter", 0))
-        rolling_mean = (l1 + l2 + l3) / 3
-
-        rolling_std = (
-            ((l1 - rolling_mean) ** 2 +
-             (l2 - rolling_mean) ** 2 +
-             (l3 - rolling_mean) ** 2) / 3
-        ) ** 0.5
-
-        scale = max(1, 10000 / max(rolling_mean, 1))
-        rolling_mean *= scale
-        rolling_std *= scale
-
-        row = {
-            "lag_1": l1,
-            "lag_2": l2,
-            "lag_3": l3,
-            "rolling_mean_3": rolling_mean,
-            "rolling_std_3": rolling_std,
-            "year": year,
-            "month": month,
-            "quarter": quarter
-        }
+        result = next(predict_sales_rows([input_data], stage="manual.predict"))
+    except Exception as e:
+        raise RuntimeError(f"Manual prediction failed: {str(e)}")
+    if "error" in result:
+        raise RuntimeError(result["error"])
+
+    del result["index"]
+    return {
+        **result,
+        "model_used": "Random Forest Regressor",
+        "note": "Rolling statistics computed automatically"
+    }
+
+def _features(lags, periods, feature_cols, rescale=True):
+    """
+    model input for manual rows, lags are (lag_1, lag_2, lag_3) and
+    periods (year, month, quarter) per row, rescale is a bool or a
+    per-row mask of the rows scored by the global model
+    """
+    X = next_features(
+        lags[:, ::-1],
+        {field: periods[:, j] for j, field in enumerate(PERIOD_FIELDS)},
+        feature_cols
+    )
+    X = pd.DataFrame(X, columns=feature_cols).fillna(0)
+    if not np.any(rescale):
+        return X
+
+    # manual lags are often entered in a smaller unit than the
+    # training data, the rolling stats are scaled up to match
+    scale = np.maximum(1, 10000 / np.maximum(X["rolling_mean_3"], 1))
+    scale = np.where(rescale, scale, 1.0)
+    X["rolling_mean_3"] *= scale
+    X["rolling_std_3"] *= scale
+    return X
+
+
+def _parse_rows(rows):
+    """
+    splits raw input rows into a lag matrix and a period matrix,
+    rows that fail to parse are reported by position
+    """
+    lags = np.zeros((len(rows), len(LAG_FIELDS)), dtype=np.float64)
+    periods = np.zeros((len(rows), len(PERIOD_FIELDS)), dtype=np.int64)
+    errors = {}
+
+    for i, row in enumerate(rows):
+        if isinstance(row, _BadLine):
+            errors[i] = row["error"]
+            continue
+        try:
+            lags[i] = [float(row.get(f, 0)) for f in LAG_FIELDS]
+            periods[i] = [int(row.get(f, 0)) for f in PERIOD_FIELDS]
+        except (TypeError, ValueError, AttributeError) as e:
+            errors[i] = str(e)
+
+    return lags, periods, errors
+
+
+def _segment_models(rows, errors):
+    """
+    rows grouped by the model that scores them, the segment's own model
+    when region, category and sub_category are sent and it has one,
+    None for the global model, the bank is asked once per segment
+    """
+    keys = {}
+    for i, row in enumerate(rows):
+        if i not in errors:
+            key = tuple(row.get(col) or None for col in SEGMENT_COLS)
+            keys.setdefault(key, []).append(i)
+
+    groups = {}
+    for key, idx in keys.items():
+        model = bank.get(key)
+        groups.setdefault(id(model), (model, []))[1].extend(idx)
+    return list(groups.values())
+
 
-        df = pd.DataFrame([[row[col] for col in feature_cols]],
-                          columns=feature_cols)
+def predict_sales_rows(rows, offset=0, stage="manual.batch_predict"):
+    """
+    vectorized version of predict_sales for a list of input dicts,
+    yields one result per row in input order
 
-        df = df.apply(pd.to_numeric, errors="coerce").fillna(0)
+    rows with region, category and sub_category use that segment's
+    model when the bank has one, their lags are then the segment's
+    last three daily sales totals and are not rescaled
+    """
+    lags, periods, errors = _parse_rows(rows)
+    feature_cols = model_registry.get_feature_cols()
+    groups = _segment_models(rows, errors)
 
-        prediction = model.predict(df)[0]
+    segment = np.zeros(len(rows), dtype=bool)
+    for model, idx in groups:
+        if model is not None:
+            segment[idx] = True
 
-        return {
-            "predicted_sales": round(float(prediction), 2),
-            "rolling_mean": round(rolling_mean, 2),
-            "rolling_std": round(rolling_std, 2),
-            "model_used": "Random Forest Regressor",
-            "note": "Rolling statistics computed automatically"
+    X = _features(lags, periods, feature_cols, rescale=~segment)
+    rolling_mean = X["rolling_mean_3"].to_numpy()
+    rolling_std = X["rolling_std_3"].to_numpy()
+
+    predictions = np.zeros(len(rows))
+    if groups:
+        with metrics.stage(stage, rows=len(rows) - len(errors)):
+            for model, idx in groups:
+                if model is None:
+                    model = model_registry.get_predictor()
+                predictions[idx] = model.predict(X.iloc[idx])
+
+    for i in range(len(rows)):
+        if i in errors:
+            yield {"index": offset + i, "error": f"Manual prediction failed: {errors[i]}"}
+            continue
+        yield {
+            "index": offset + i,
+            "predicted_sales": round(float(predictions[i]), 2),
+            "rolling_mean": round(float(rolling_mean[i]), 2),
+            "rolling_std": round(float(rolling_std[i]), 2),
+            "model_source": "segment" if segment[i] else "global"
         }
 
-    except Exception as e:
-        raise RuntimeError(f"Manual prediction failed: {str(e)}")
\ No newline at end of file
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _BadLine(dict):
+    """
+    stands in for an NDJSON line that is not valid JSON, so it is
+    reported at its position like any other unparseable row
+    """
+
+
+def _ndjson_rows(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield _BadLine(error=f"invalid JSON: {e}")
+
+
+def predict_sales_batch(request):
+    """
+    scores many what-if rows per call, input is a JSON array
+    or NDJSON (application/x-ndjson) streamed in
+    """
+    ndjson_in = "ndjson" in (request.mimetype or "")
+    ndjson_out = ndjson_in or "ndjson" in request.headers.get("Accept", "")
+
+    if ndjson_in:
+        rows = _ndjson_rows(request.stream)
+    else:
+        rows = request.get_json(silent=True)
+        if isinstance(rows, dict):
+            rows = rows.get("rows")
+        if not isinstance(rows, list):
+            return jsonify({"error": "Expected a JSON array of input rows"}), 400
+
+    def generate():
+        offset = 0
+        first = True
+        if not ndjson_out:
+            yield "["
+        for chunk in _chunks(rows, BATCH_SIZE):
+            for result in predict_sales_rows(chunk, offset):
+                if ndjson_out:
+                    yield json.dumps(result) + "\n"
+                else:
+                    yield ("" if first else ",") + json.dumps(result)
+                    first = False
+            offset += len(chunk)
+        if not ndjson_out:
+            yield "]"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson" if ndjson_out else "application/json"
+    )
@@ -0,0 +1,193 @@
+import os
+import time
+import threading
+from functools import wraps
+
+from flask import g, has_request_context, request
+
+# set SPARKSALES_METRICS=0 to turn every stage into a no-op
+ENABLED = os.environ.get("SPARKSALES_METRICS", "1") != "0"
+# X-Timing is sent when enabled here or asked for with an X-Timing request header
+TIMING_HEADER = os.environ.get("SPARKSALES_TIMING_HEADER", "0") == "1"
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    cumulative bucket counts, sum and count per label, plus running
+    totals of rows and bytes handled by that label
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label, seconds, rows=None, nbytes=None):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = {
+                    "counts": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                    "rows": 0,
+                    "bytes": 0
+                }
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+            if rows:
+                series["rows"] += int(rows)
+            if nbytes:
+                series["bytes"] += int(nbytes)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                label: {**series, "counts": list(series["counts"])}
+                for label, series in self._series.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+stage_times = Histogram()
+request_times = Histogram()
+
+
+class _Stage:
+    __slots__ = ("name", "rows", "bytes", "_start")
+
+    def __init__(self, name, rows, nbytes):
+        self.name = name
+        self.rows = rows
+        self.bytes = nbytes
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        stage_times.observe(self.name, elapsed, self.rows, self.bytes)
+        if has_request_context():
+            g.setdefault("stage_timings", []).append((self.name, elapsed))
+        return False
+
+
+class _NoopStage:
+    __slots__ = ()
+    rows = None
+    bytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP = _NoopStage()
+
+
+def stage(name, rows=None, nbytes=None):
+    """
+    times a block as one stage, rows and bytes can be passed up front
+    or set on the returned object once known
+
+        with metrics.stage("csv.read") as s:
+            df = pd.read_csv(file)
+            s.rows = len(df)
+    """
+    if not ENABLED:
+        return _NOOP
+    return _Stage(name, rows, nbytes)
+
+
+def timed(name):
+    """
+    decorator form of stage()
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(name, None, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+def _render_histogram(lines, metric, help_text, label, histogram):
+    lines.append(f"# HELP {metric}_seconds {help_text}")
+    lines.append(f"# TYPE {metric}_seconds histogram")
+    snapshot = histogram.snapshot()
+    for value, series in sorted(snapshot.items()):
+        for bound, count in zip(histogram.buckets, series["counts"]):
+            lines.append(f"{metric}_seconds_bucket{{{_labels(**{label: value}, le=bound)}}} {count}")
+        lines.append(f"{metric}_seconds_bucket{{{_labels(**{label: value}, le='+Inf')}}} {series['count']}")
+        lines.append(f"{metric}_seconds_sum{{{_labels(**{label: value})}}} {series['sum']:.6f}")
+        lines.append(f"{metric}_seconds_count{{{_labels(**{label: value})}}} {series['count']}")
+    return snapshot
+
+
+def render():
+    """
+    all recorded metrics in the Prometheus text exposition format
+    """
+    lines = []
+    _render_histogram(
+        lines, "sparksales_request", "Request latency per endpoint", "endpoint", request_times
+    )
+    snapshot = _render_histogram(
+        lines, "sparksales_stage", "Time spent per service stage", "stage", stage_times
+    )
+
+    for field, help_text in (("rows", "Rows processed per stage"), ("bytes", "Bytes processed per stage")):
+        lines.append(f"# HELP sparksales_stage_{field}_total {help_text}")
+        lines.append(f"# TYPE sparksales_stage_{field}_total counter")
+        for value, series in sorted(snapshot.items()):
+            lines.append(f"sparksales_stage_{field}_total{{{_labels(stage=value)}}} {series[field]}")
+
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """
+    request latency per endpoint and the optional X-Timing header
+    """
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop("request_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        request_times.observe(request.url_rule.rule if request.url_rule else "unmatched", elapsed)
+
+        if TIMING_HEADER or "X-Timing" in request.headers:
+            parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in g.get("stage_timings", [])]
+            parts.append(f"total;dur={elapsed * 1000:.2f}")
+            response.headers["X-Timing"] = ", ".join(parts)
+        return response
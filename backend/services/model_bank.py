@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from backend.services.csv_loader import load_base_csv, SEGMENT_COLS
+from backend.services.featureeng import grouped_lag_features, valid_rows
+from backend.services.forest_engine import compile_forest
+from backend.services import model_registry
+from backend.services import metrics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_PATH = os.path.join(PROJECT_ROOT, "data", "cleaned", "clean.csv")
+BANK_DIR = os.path.join(model_registry.MODEL_DIR, "segments")
+MANIFEST_PATH = os.path.join(BANK_DIR, "manifest.json")
+
+# set SPARKSALES_SEGMENT_MODELS=0 to forecast every segment with the global model
+ENABLED = os.environ.get("SPARKSALES_SEGMENT_MODELS", "1") != "0"
+# loaded segment models kept in memory, least recently used go first
+CACHE_BYTES = int(float(os.environ.get("SPARKSALES_SEGMENT_CACHE_MB", 64)) * 1024 * 1024)
+
+# segments with fewer feature rows keep the global model
+MIN_ROWS = 60
+# segment models are only ever served through next_features, so their
+# rolling window covers the periods before the target, not the target
+ROLLING_CLOSED = "left"
+# small forests, one per segment
+SEGMENT_PARAMS = {
+    "n_estimators": 50,
+    "max_depth": 8,
+    "min_samples_leaf": 3,
+    "random_state": 42,
+    "n_jobs": 1
+}
+
+
+def segment_file(key):
+    digest = hashlib.sha1("|".join(map(str, key)).encode()).hexdigest()[:16]
+    return f"segment_{digest}.joblib"
+
+
+def _train_chunk(items, params, directory):
+    """
+    pool worker: fits and saves the model of each segment in a chunk
+    """
+    out = []
+    for key, X, y in items:
+        start = time.perf_counter()
+        model = RandomForestRegressor(**params).fit(X, y)
+        fit_time = time.perf_counter() - start
+
+        path = os.path.join(directory, segment_file(key))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(model, tmp)
+        os.replace(tmp, path)
+
+        out.append({
+            **dict(zip(SEGMENT_COLS, key)),
+            "status": "trained",
+            "file": os.path.basename(path),
+            "rows": len(y),
+            "fit_time_s": round(fit_time, 4),
+            "file_bytes": os.path.getsize(path),
+            "resident_bytes": model_registry._payload_bytes(model)
+        })
+    return out
+
+
+def train(data=DATA_PATH, jobs=None, min_rows=MIN_ROWS, params=None, directory=BANK_DIR):
+    """
+    fits one forest per region/category/sub_category on that segment's
+    daily series (the series /forecast/segmented forecasts), segments
+    with too little history are listed as falling back to the global model
+    """
+    params = {**SEGMENT_PARAMS, **(params or {})}
+    feature_cols = list(model_registry.get_feature_cols())
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+
+    df = load_base_csv(data, dayfirst=False)
+    # features for every segment in one grouped pass
+    agg, starts = grouped_lag_features(df, SEGMENT_COLS, closed=ROLLING_CLOSED)
+    valid = valid_rows(len(agg), starts, closed=ROLLING_CLOSED)
+    X_all = agg[feature_cols].to_numpy(np.float64)
+    y_all = agg["sales"].to_numpy(np.float64)
+    bounds = np.append(starts, len(agg))
+
+    items, segments = [], []
+    for g in range(len(starts)):
+        rows = np.arange(bounds[g], bounds[g + 1])
+        rows = rows[valid[rows]]
+        key = tuple(agg[SEGMENT_COLS].iloc[bounds[g]])
+        if len(rows) < min_rows:
+            segments.append({**dict(zip(SEGMENT_COLS, key)), "status": "fallback", "rows": len(rows)})
+        else:
+            items.append((key, X_all[rows], y_all[rows]))
+
+    jobs = jobs or os.cpu_count() or 1
+    # a few chunks per worker keeps the pool busy without pickling each segment alone
+    size = max(1, -(-len(items) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(_train_chunk, items[i:i + size], params, directory)
+            for i in range(0, len(items), size)
+        ]
+        for future in as_completed(futures):
+            for row in future.result():
+                segments.append(row)
+                print(
+                    f"{row['region']}/{row['category']}/{row['sub_category']}: "
+                    f"{row['rows']} rows, {row['fit_time_s']}s, {row['file_bytes'] / 1024:.0f} KB"
+                )
+
+    segments.sort(key=lambda row: tuple(row[col] for col in SEGMENT_COLS))
+    manifest = {
+        "trained_at": time.time(),
+        "data": data,
+        "feature_cols": feature_cols,
+        "rolling_closed": ROLLING_CLOSED,
+        "params": params,
+        "min_rows": min_rows,
+        "train_time_s": round(time.perf_counter() - started, 3),
+        "segments": segments
+    }
+    tmp = os.path.join(directory, f"manifest.json.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(directory, "manifest.json"))
+    return manifest
+
+
+class ModelBank:
+    """
+    per-segment models named in the manifest, loaded on first use and
+    kept in an LRU bounded by resident bytes, segments without a model
+    (or partial filters like "all sub-categories") get the global one
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH, max_bytes=CACHE_BYTES):
+        self.manifest_path = manifest_path
+        self.max_bytes = max_bytes
+        self._manifest = None
+        self._mtime = None
+        self._models = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.fallbacks = 0
+        self.load_times = {}
+
+    def _entries(self):
+        """
+        trained segments by key, re-read when the manifest changes
+        """
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            mtime = None
+        if mtime is None:
+            if self._mtime is not None:
+                with self._lock:
+                    self._manifest, self._mtime = None, None
+                    self._models.clear()
+                    self._bytes = 0
+            return {}
+        if mtime != self._mtime:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            # a bank trained on other features than next_features builds
+            # would score far from its fit, keep the global model instead
+            current = manifest.get("rolling_closed") == ROLLING_CLOSED
+            with self._lock:
+                self._manifest = {
+                    tuple(row[col] for col in SEGMENT_COLS): row
+                    for row in manifest["segments"] if current and row["status"] == "trained"
+                }
+                self._mtime = mtime
+                # a retrained bank replaces every cached model
+                self._models.clear()
+                self._bytes = 0
+        return self._manifest
+
+    def version(self):
+        self._entries()
+        return f"segments:{self._mtime:.6f}" if self._mtime else "segments:none"
+
+    def _load(self, key, entry):
+        path = os.path.join(os.path.dirname(self.manifest_path), entry["file"])
+        start = time.perf_counter()
+        with metrics.stage("segment_model.load", nbytes=entry.get("file_bytes")):
+            model = joblib.load(path, mmap_mode=model_registry.MMAP_MODE)
+            predictor = compile_forest(model) or model
+        load_time = time.perf_counter() - start
+
+        size = entry.get("resident_bytes", 0)
+        if predictor is not model:
+            size += predictor.nbytes
+        with self._lock:
+            self.loads += 1
+            self.load_times["|".join(map(str, key))] = round(load_time, 4)
+            if key not in self._models:
+                self._models[key] = (predictor, size)
+                self._bytes += size
+            while self._bytes > self.max_bytes and len(self._models) > 1:
+                _, (_, evicted) = self._models.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return predictor
+
+    def get(self, key):
+        """
+        the segment's model, or None when the global one should be used
+        """
+        if not ENABLED or any(value is None for value in key):
+            return None
+        entry = self._entries().get(tuple(key))
+        if entry is None:
+            with self._lock:
+                self.fallbacks += 1
+            return None
+
+        with self._lock:
+            cached = self._models.get(tuple(key))
+            if cached is not None:
+                self._models.move_to_end(tuple(key))
+                self.hits += 1
+                return cached[0]
+        return self._load(tuple(key), entry)
+
+    def predictor(self, key):
+        """
+        (model, source) for a segment, source is "segment" or "global"
+        """
+        model = self.get(key)
+        if model is None:
+            return model_registry.get_predictor(), "global"
+        return model, "segment"
+
+    def stats(self):
+        entries = self._entries()
+        with self._lock:
+            return {
+                "enabled": ENABLED,
+                "trained_segments": len(entries),
+                "in_memory": len(self._models),
+                "memory_bytes": self._bytes,
+                "max_memory_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "fallbacks": self.fallbacks,
+                "load_time_s": dict(self.load_times)
+            }
+
+
+bank = ModelBank()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train one model per region/category/sub-category")
+    parser.add_argument("--data", default=DATA_PATH, help="CSV or dataset_store .parquet")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, defaults to all cores")
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS,
+                        help="segments with fewer feature rows fall back to the global model")
+    parser.add_argument("--trees", type=int, default=SEGMENT_PARAMS["n_estimators"])
+    parser.add_argument("--max-depth", type=int, default=SEGMENT_PARAMS["max_depth"])
+    args = parser.parse_args(argv)
+
+    manifest = train(
+        data=args.data,
+        jobs=args.jobs,
+        min_rows=args.min_rows,
+        params={"n_estimators": args.trees, "max_depth": args.max_depth}
+    )
+    trained = [row for row in manifest["segments"] if row["status"] == "trained"]
+    print(
+        f"{len(trained)} segment models, {len(manifest['segments']) - len(trained)} on the global model, "
+        f"{sum(row['file_bytes'] for row in trained) / 1e6:.1f} MB, {manifest['train_time_s']}s"
+    )
+    print("manifest written to:", MANIFEST_PATH)
+
+
+if __name__ == "__main__":
+    main()
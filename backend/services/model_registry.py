@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import pickle
+import threading
+import joblib
+import numpy as np
+
+from . import metrics
+from .forest_engine import compile_forest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+
+MODEL_PATH = os.path.join(MODEL_DIR, "sales_forecast.pkl")
+FEATURE_COLS_PATH = os.path.join(MODEL_DIR, "feature_cols.pkl")
+SARIMA_PATH = os.path.join(MODEL_DIR, "sarima_model.pkl")
+SARIMA_META_PATH = os.path.join(MODEL_DIR, "sarima_model.meta.json")
+FOREST_META_PATH = os.path.join(MODEL_DIR, "sales_forecast.meta.json")
+
+# set SPARKSALES_MODEL_MMAP=0 to load the forest fully into private memory
+MMAP_MODE = "r" if os.environ.get("SPARKSALES_MODEL_MMAP", "1") != "0" else None
+# set SPARKSALES_FOREST_ENGINE=0 to predict through sklearn directly
+FOREST_ENGINE = os.environ.get("SPARKSALES_FOREST_ENGINE", "1") != "0"
+
+
+def _load_joblib(path):
+    return joblib.load(path, mmap_mode=MMAP_MODE)
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+ARTIFACTS = {
+    "sales_forecast": (MODEL_PATH, _load_joblib),
+    "feature_cols": (FEATURE_COLS_PATH, _load_joblib),
+    "sarima": (SARIMA_PATH, _load_pickle),
+}
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def _payload_bytes(obj, seen=None, depth=0):
+    """
+    rough resident size: numpy buffers reachable from the object
+    (sklearn trees expose theirs through __getstate__)
+    """
+    # keeps visited objects alive so temporary __getstate__ dicts
+    # cannot hand their id to the next object
+    seen = {} if seen is None else seen
+    if id(obj) in seen or depth > 10:
+        return 0
+    seen[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return 0
+    if isinstance(obj, dict):
+        return sum(_payload_bytes(v, seen, depth + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return sum(_payload_bytes(v, seen, depth + 1) for v in obj)
+
+    state = getattr(obj, "__dict__", None)
+    if state is None and hasattr(obj, "__getstate__"):
+        try:
+            state = obj.__getstate__()
+        except TypeError:
+            state = None
+    return _payload_bytes(state, seen, depth + 1) if state is not None else 0
+
+
+def _engine(name, obj):
+    """
+    flattened fast-inference copy of the forest, built once per load
+    """
+    if name != "sales_forecast" or not FOREST_ENGINE:
+        return {}
+    start = time.perf_counter()
+    with metrics.stage("model.compile"):
+        engine = compile_forest(obj)
+    if engine is None:
+        return {}
+    return {
+        "engine": engine,
+        "compile_time_s": round(time.perf_counter() - start, 4),
+        "engine_bytes": engine.nbytes,
+    }
+
+
+def _window(name):
+    """
+    rolling window the forest was trained on, from its metadata, the
+    notebook forest has none and used pandas' right-closed default
+    """
+    if name != "sales_forecast":
+        return {}
+    return {"rolling_closed": load_meta(FOREST_META_PATH).get("rolling_closed", "right")}
+
+
+def _load(name):
+    path, loader = ARTIFACTS[name]
+    mtime = os.path.getmtime(path)
+
+    start = time.perf_counter()
+    with metrics.stage("model.load", nbytes=os.path.getsize(path)):
+        obj = loader(path)
+    load_time = time.perf_counter() - start
+
+    _loaded[name] = {
+        "object": obj,
+        "path": path,
+        "mtime": mtime,
+        "load_time_s": round(load_time, 4),
+        "resident_bytes": _payload_bytes(obj),
+        "file_bytes": os.path.getsize(path),
+        "loaded_at": time.time(),
+        **_window(name),
+        **_engine(name, obj),
+    }
+    return _loaded[name]
+
+
+def _entry(name):
+    """
+    returns the cached entry, (re)loading it when missing or when
+    the file on disk has a newer mtime
+    """
+    entry = _loaded.get(name)
+    if entry is not None:
+        try:
+            if os.path.getmtime(entry["path"]) == entry["mtime"]:
+                return entry
+        except OSError:
+            # file removed after load, keep serving what we have
+            return entry
+
+    with _lock:
+        entry = _loaded.get(name)
+        if entry is not None and os.path.exists(entry["path"]) \
+                and os.path.getmtime(entry["path"]) == entry["mtime"]:
+            return entry
+        return _load(name)
+
+
+def get(name):
+    return _entry(name)["object"]
+
+
+def get_model():
+    return get("sales_forecast")
+
+
+def get_predictor():
+    """
+    what services should call predict() on, the compiled forest when
+    one was built and the sklearn model otherwise
+    """
+    entry = _entry("sales_forecast")
+    return entry.get("engine") or entry["object"]
+
+
+def get_feature_cols():
+    return get("feature_cols")
+
+
+def get_sarima():
+    return get("sarima")
+
+
+def rolling_closed():
+    """
+    "left" or "right", see horizon_forecast.horizon_error
+    """
+    return _entry("sales_forecast")["rolling_closed"]
+
+
+def model_version(name="sales_forecast"):
+    """
+    identifies the currently loaded artifact, changes on hot reload
+    """
+    entry = _entry(name)
+    return f"{name}:{entry['mtime']:.6f}"
+
+
+def preload(names=None):
+    for name in names or ARTIFACTS:
+        if os.path.exists(ARTIFACTS[name][0]):
+            _entry(name)
+
+
+def reload(name=None):
+    with _lock:
+        for key in [name] if name else list(_loaded):
+            _loaded.pop(key, None)
+
+
+def store(name, obj):
+    """
+    persists an artifact atomically (temp file + rename) so readers
+    never see a half-written model, then serves it from memory
+    """
+    path, loader = ARTIFACTS[name]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    start = time.perf_counter()
+    if loader is _load_pickle:
+        with open(tmp, "wb") as f:
+            pickle.dump(obj, f)
+    else:
+        joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+
+    with _lock:
+        _loaded[name] = {
+            "object": obj,
+            "path": path,
+            "mtime": os.path.getmtime(path),
+            "load_time_s": 0.0,
+            "save_time_s": round(time.perf_counter() - start, 4),
+            "resident_bytes": _payload_bytes(obj),
+            "file_bytes": os.path.getsize(path),
+            "loaded_at": time.time(),
+            **_window(name),
+            **_engine(name, obj),
+        }
+    return path
+
+
+def load_meta(path=None):
+    try:
+        with open(path or SARIMA_META_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_meta(meta, path=None):
+    """
+    json sidecar of an artifact, written atomically like store(),
+    the SARIMA metadata unless another path is given
+    """
+    path = path or SARIMA_META_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, path)
+
+
+def model_stats():
+    """
+    load time and resident size per loaded model
+    """
+    return {
+        name: {k: v for k, v in entry.items() if k not in ("object", "engine")}
+        for name, entry in _loaded.items()
+    }
@@ -1,8 +1,6 @@
+import io
 import os
 import datetime
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 import pandas as pd
 
 from reportlab.lib.pagesizes import A4
@@ -18,12 +16,12 @@ from reportlab.platypus import (
     PageBreak
 )
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-REPORT_DIR = os.path.join(BASE_DIR, "reports")
-CHART_DIR = os.path.join(REPORT_DIR, "charts")
+from . import report_charts
+from .sales_trend import rolling_average
+from . import metrics
 
-os.makedirs(REPORT_DIR, exist_ok=True)
-os.makedirs(CHART_DIR, exist_ok=True)
+# "vector" draws charts with reportlab.graphics, "matplotlib" embeds PNGs
+CHART_BACKEND = os.environ.get("SPARKSALES_CHART_BACKEND", "vector")
 
 styles = getSampleStyleSheet()
 
@@ -56,67 +54,96 @@ BODY = ParagraphStyle(
     spaceAfter=8
 )
 
+def _figure(figsize):
+    """
+    Agg figure through the object-oriented API, no pyplot global state,
+    matplotlib is only imported when this backend is used
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize, dpi=120)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _render_png(fig):
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format="png")
+    buf.seek(0)
+    return buf
+
 #graphs,charts
 def generate_sales_trend_chart(dates, sales):
-    path = os.path.join(CHART_DIR, "sales_trend.png")
-    plt.figure(figsize=(7, 3.5), dpi=120)
-    plt.plot(dates, sales, linewidth=2)
-    plt.title("Sales Trend")
-    plt.xticks(rotation=45)
-    plt.grid(alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(path)
-    plt.close()
-    return path
-
-
-def generate_rolling_avg_chart(dates, sales):
-    path = os.path.join(CHART_DIR, "sales_vs_rolling_avg.png")
-
-    df = pd.DataFrame({"date": dates, "sales": sales})
-    df["rolling_avg"] = df["sales"].rolling(window=3, min_periods=1).mean()
-
-    plt.figure(figsize=(7, 3.5), dpi=120)
-    plt.plot(df["date"], df["sales"], label="Actual Sales", alpha=0.6, linewidth=2)
-    plt.plot(df["date"], df["rolling_avg"], label="Rolling Average (3)", linewidth=3)
-    plt.title("Sales vs Rolling Average")
-    plt.xticks(rotation=45)
-    plt.grid(alpha=0.3)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(path)
-    plt.close()
-    return path
+    fig = _figure((7, 3.5))
+    ax = fig.add_subplot()
+    ax.plot(dates, sales, linewidth=2)
+    ax.set_title("Sales Trend")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.grid(alpha=0.3)
+    return _render_png(fig)
+
+
+def generate_rolling_avg_chart(dates, sales, rolling_avg):
+    fig = _figure((7, 3.5))
+    ax = fig.add_subplot()
+    ax.plot(dates, sales, label="Actual Sales", alpha=0.6, linewidth=2)
+    ax.plot(dates, rolling_avg, label="Rolling Average (3)", linewidth=3)
+    ax.set_title("Sales vs Rolling Average")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.grid(alpha=0.3)
+    ax.legend()
+    return _render_png(fig)
 
 
 def generate_monthly_growth_chart(dates, growth):
-    path = os.path.join(CHART_DIR, "monthly_growth.png")
-    plt.figure(figsize=(7, 3.5), dpi=120)
-    plt.bar(dates, growth, color="#2ca02c")
-    plt.title("Monthly Growth Analysis")
-    plt.xlabel("Month")
-    plt.ylabel("Growth (%)")
-    plt.xticks(rotation=45)
-    plt.grid(axis="y", alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(path)
-    plt.close()
-    return path
+    fig = _figure((7, 3.5))
+    ax = fig.add_subplot()
+    ax.bar(dates, growth, color="#2ca02c")
+    ax.set_title("Monthly Growth Analysis")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Growth (%)")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.grid(axis="y", alpha=0.3)
+    return _render_png(fig)
 
 
 def generate_performance_delta(avg_sales, latest_sales):
-    path = os.path.join(CHART_DIR, "performance_delta.png")
-    plt.figure(figsize=(4, 3), dpi=120)
-    plt.bar(
+    fig = _figure((4, 3))
+    ax = fig.add_subplot()
+    ax.bar(
         ["Average Sales", "Latest Sales"],
         [avg_sales, latest_sales],
         color=["#1f77b4", "#ff7f0e"]
     )
-    plt.title("Performance Delta")
-    plt.tight_layout()
-    plt.savefig(path)
-    plt.close()
-    return path
+    ax.set_title("Performance Delta")
+    return _render_png(fig)
+
+
+def _chart(kind, width, height, *args, backend=None):
+    """
+    chart flowable: native reportlab vector drawing by default,
+    or a matplotlib PNG with SPARKSALES_CHART_BACKEND=matplotlib
+    """
+    if (backend or CHART_BACKEND) == "matplotlib":
+        return Image(RASTER_CHARTS[kind](*args), width=width, height=height)
+    return VECTOR_CHARTS[kind](*args, width, height)
+
+
+RASTER_CHARTS = {
+    "sales_trend": generate_sales_trend_chart,
+    "rolling_avg": generate_rolling_avg_chart,
+    "monthly_growth": generate_monthly_growth_chart,
+    "performance_delta": generate_performance_delta,
+}
+
+VECTOR_CHARTS = {
+    "sales_trend": report_charts.sales_trend_drawing,
+    "rolling_avg": report_charts.rolling_avg_drawing,
+    "monthly_growth": report_charts.monthly_growth_drawing,
+    "performance_delta": report_charts.performance_delta_drawing,
+}
 
 #footer
 def add_footer(canvas, doc):
@@ -129,11 +156,21 @@ def add_footer(canvas, doc):
     )
 
 #pdf generator function
-def generate_pdf_report(data):
-    file_path = os.path.join(REPORT_DIR, "SparkSales_Report.pdf")
+@metrics.timed("report.render")
+def generate_pdf_report(data, progress=None, chart_backend=None):
+    """
+    builds the report in memory and returns it as a BytesIO,
+    progress, if given, is called as progress(done, total) per rendered stage
+    """
+    buffer = io.BytesIO()
+    total = 5
+
+    def step(done):
+        if progress is not None:
+            progress(done, total)
 
     doc = SimpleDocTemplate(
-        file_path,
+        buffer,
         pagesize=A4,
         leftMargin=50,
         rightMargin=50,
@@ -200,39 +237,58 @@ def generate_pdf_report(data):
     dates = trend.get("dates", [])
     sales = trend.get("sales", [])
     growth = trend.get("growth", [])
+    # sent along by /forecast/csv, older payloads only have the sales
+    rolling_avg = trend.get("rolling_avg") or rolling_average(
+        pd.to_numeric(pd.Series(sales, dtype=object), errors="coerce").fillna(0)
+    ).tolist()
 
     if len(dates) > 1:
-        story.append(Image(
-            generate_sales_trend_chart(dates, sales),
-            width=6.5 * inch,
-            height=3 * inch
+        story.append(_chart(
+            "sales_trend",
+            6.5 * inch,
+            3 * inch,
+            dates, sales,
+            backend=chart_backend
         ))
+        step(1)
 
         story.append(Spacer(1, 14))
 
-        story.append(Image(
-            generate_rolling_avg_chart(dates, sales),
-            width=6.5 * inch,
-            height=3 * inch
+        story.append(_chart(
+            "rolling_avg",
+            6.5 * inch,
+            3 * inch,
+            dates, sales, rolling_avg,
+            backend=chart_backend
         ))
+        step(2)
 
         story.append(Spacer(1, 14))
 
-        story.append(Image(
-            generate_monthly_growth_chart(dates, growth),
-            width=6.5 * inch,
-            height=3 * inch
+        story.append(_chart(
+            "monthly_growth",
+            6.5 * inch,
+            3 * inch,
+            dates, growth,
+            backend=chart_backend
         ))
+        step(3)
         
     story.append(PageBreak())
     story.append(Paragraph("Performance Analysis", SECTION))
     story.append(Spacer(1, 12))
 
-    story.append(Image(
-        generate_performance_delta(avg_sales, latest_sales),
-        width=3.5 * inch,
-        height=3 * inch
+    story.append(_chart(
+        "performance_delta",
+        3.5 * inch,
+        3 * inch,
+        avg_sales,
+        latest_sales,
+        backend=chart_backend
     ))
+    step(4)
 
     doc.build(story, onFirstPage=add_footer, onLaterPages=add_footer)
-    return file_path
\ No newline at end of file
+    step(5)
+    buffer.seek(0)
+    return buffer
\ No newline at end of file
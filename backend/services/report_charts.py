@@ -0,0 +1,139 @@
+import math
+
+from reportlab.lib.colors import HexColor
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+
+GRID = HexColor("#dddddd")
+BLUE = HexColor("#1f77b4")
+ORANGE = HexColor("#ff7f0e")
+GREEN = HexColor("#2ca02c")
+
+# category labels kept on the x axis, the rest are blanked
+MAX_LABELS = 12
+
+
+def _values(values):
+    out = []
+    for v in values:
+        try:
+            v = float(v)
+        except (TypeError, ValueError):
+            v = 0.0
+        out.append(v if math.isfinite(v) else 0.0)
+    return out
+
+
+def _labels(labels):
+    step = max(1, math.ceil(len(labels) / MAX_LABELS))
+    return [str(label) if i % step == 0 else "" for i, label in enumerate(labels)]
+
+
+def _drawing(width, height, title):
+    d = Drawing(width, height)
+    d.add(String(
+        width / 2,
+        height - 14,
+        title,
+        fontName="Helvetica-Bold",
+        fontSize=11,
+        textAnchor="middle"
+    ))
+    return d
+
+
+def _place(chart, width, height, legend=False):
+    chart.x = 50
+    chart.y = 50
+    chart.width = width - 65
+    chart.height = height - (90 if legend else 75)
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.visibleGrid = 1
+    chart.valueAxis.gridStrokeColor = GRID
+    chart.categoryAxis.labels.fontSize = 7
+    chart.categoryAxis.labels.angle = 45
+    chart.categoryAxis.labels.boxAnchor = "ne"
+    chart.categoryAxis.visibleTicks = 0
+
+
+def _legend(d, items, width, height):
+    legend = Legend()
+    legend.x = 60
+    legend.y = height - 28
+    legend.fontSize = 7
+    legend.columnMaximum = 1
+    legend.deltax = 110
+    legend.alignment = "right"
+    legend.colorNamePairs = items
+    d.add(legend)
+
+
+def line_chart(width, height, title, labels, series, colors, names=None):
+    d = _drawing(width, height, title)
+
+    chart = HorizontalLineChart()
+    _place(chart, width, height, legend=bool(names))
+    chart.data = [tuple(_values(s)) for s in series]
+    chart.categoryAxis.categoryNames = _labels(labels)
+    chart.joinedLines = 1
+    for i, color in enumerate(colors):
+        chart.lines[i].strokeColor = color
+        chart.lines[i].strokeWidth = 1.5
+    d.add(chart)
+
+    if names:
+        _legend(d, list(zip(colors, names)), width, height)
+    return d
+
+
+def bar_chart(width, height, title, labels, values, colors):
+    d = _drawing(width, height, title)
+
+    chart = VerticalBarChart()
+    _place(chart, width, height)
+    chart.data = [tuple(_values(values))]
+    chart.categoryAxis.categoryNames = _labels(labels)
+    #bars are compared by height, keep zero on the axis
+    chart.valueAxis.valueMin = min(0.0, *chart.data[0]) if chart.data[0] else 0.0
+    chart.barSpacing = 1
+    chart.bars.strokeColor = None
+    for i, color in enumerate(colors):
+        chart.bars[(0, i)].fillColor = color
+    if len(colors) == 1:
+        chart.bars[0].fillColor = colors[0]
+    d.add(chart)
+    return d
+
+
+#vector versions of the report charts
+def sales_trend_drawing(dates, sales, width, height):
+    return line_chart(width, height, "Sales Trend", dates, [sales], [BLUE])
+
+
+def rolling_avg_drawing(dates, sales, rolling_avg, width, height):
+    return line_chart(
+        width,
+        height,
+        "Sales vs Rolling Average",
+        dates,
+        [sales, rolling_avg],
+        [BLUE, ORANGE],
+        names=["Actual Sales", "Rolling Average (3)"]
+    )
+
+
+def monthly_growth_drawing(dates, growth, width, height):
+    return bar_chart(width, height, "Monthly Growth Analysis (%)", dates, growth, [GREEN])
+
+
+def performance_delta_drawing(avg_sales, latest_sales, width, height):
+    return bar_chart(
+        width,
+        height,
+        "Performance Delta",
+        ["Average Sales", "Latest Sales"],
+        [avg_sales, latest_sales],
+        [BLUE, ORANGE]
+    )
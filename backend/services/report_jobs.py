@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+
+from . import executors
+from .pdfgen import generate_pdf_report
+from .result_cache import ResultCache
+
+# queued + running jobs allowed before new submissions are refused
+MAX_PENDING_REPORTS = int(os.environ.get("SPARKSALES_MAX_PENDING_REPORTS", 8))
+JOB_TTL = float(os.environ.get("SPARKSALES_REPORT_TTL", 3600))
+# finished jobs (and their PDFs) kept for download, by count and by bytes
+MAX_FINISHED_REPORTS = int(os.environ.get("SPARKSALES_FINISHED_REPORTS", 32))
+FINISHED_BYTES = int(float(os.environ.get("SPARKSALES_FINISHED_REPORTS_MB", 64)) * 1024 * 1024)
+
+_lock = threading.Lock()
+# queued and running jobs, moved to _finished once rendered
+_jobs = {}
+_finished = ResultCache(max_entries=MAX_FINISHED_REPORTS, ttl=JOB_TTL, max_bytes=FINISHED_BYTES)
+_by_payload = {}
+
+
+class QueueFull(Exception):
+    pass
+
+
+def payload_key(data):
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _lookup(job_id):
+    # caller holds _lock
+    return _jobs.get(job_id) or _finished.get(job_id)
+
+
+def _expire():
+    """
+    forgets payloads whose job expired or was evicted, caller holds _lock
+    """
+    for key, job_id in list(_by_payload.items()):
+        if _lookup(job_id) is None:
+            _by_payload.pop(key)
+
+
+def _update(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields)
+
+
+def _run(job_id, data):
+    _update(job_id, status="running", started_at=time.time())
+
+    def progress(done, total):
+        _update(job_id, progress=round(done / total, 2))
+
+    result = {"status": "failed"}
+    try:
+        # reports are rendered in memory, concurrent jobs share no files
+        result["pdf"] = generate_pdf_report(data, progress=progress).getvalue()
+        result["status"] = "done"
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        with _lock:
+            job = _jobs.pop(job_id)
+            job.update(result, finished_at=time.time())
+            _finished.set(job_id, job)
+
+
+def submit(data):
+    """
+    queues a report render, identical payloads share one job;
+    raises QueueFull when too many renders are pending
+    """
+    key = payload_key(data)
+
+    with _lock:
+        _expire()
+
+        existing = _lookup(_by_payload.get(key))
+        if existing is not None and existing["status"] != "failed":
+            return dict(existing)
+
+        pending = len(_jobs)
+        if pending >= MAX_PENDING_REPORTS:
+            raise QueueFull(f"{pending} reports already pending")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "progress": 0.0,
+            "payload_key": key,
+            "pdf": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        _jobs[job_id] = job
+        _by_payload[key] = job_id
+
+    # renders share the "report" limit with /download-report
+    executors.submit("report", _run, job_id, data)
+    return dict(job)
+
+
+def get(job_id):
+    """
+    a snapshot of the job, None once it expired or was evicted
+    """
+    with _lock:
+        job = _lookup(job_id)
+        return dict(job) if job is not None else None
+
+
+def describe(job):
+    return {k: job[k] for k in ("id", "status", "progress", "error")}
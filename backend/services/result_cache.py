@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+CACHE_SIZE = int(os.environ.get("SPARKSALES_CACHE_SIZE", 32))
+CACHE_TTL = float(os.environ.get("SPARKSALES_CACHE_TTL", 900))
+# parsed frames and segment cubes are large, entries are also bounded by bytes
+CACHE_BYTES = int(float(os.environ.get("SPARKSALES_CACHE_MB", 256)) * 1024 * 1024)
+
+
+def nbytes(obj):
+    """
+    approximate resident size of a cached value, frames count their
+    object columns, objects with an nbytes attribute (arrays, cubes,
+    compiled forests) report their own
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(obj, pd.DataFrame) else usage)
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if sparse.issparse(obj):
+        return sum(getattr(obj, part).nbytes for part in ("data", "indices", "indptr") if hasattr(obj, part))
+    if isinstance(obj, np.ndarray) or hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(nbytes(k) + nbytes(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(nbytes(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+class ResultCache:
+    """
+    LRU with a time-to-live, bounded by entry count and by bytes,
+    shared by the upload endpoints
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, max_bytes=CACHE_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            stored_at, value, size = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = nbytes(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            # a value larger than the whole budget is not kept
+            if size > self.max_bytes:
+                self.evictions += 1
+                return
+
+            self._data[key] = (time.monotonic(), value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "memory_bytes": self._bytes,
+                "max_memory_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+def file_digest(file, chunk_size=1 << 20):
+    """
+    sha256 of an uploaded file, the stream is rewound afterwards
+    """
+    stream = getattr(file, "stream", file)
+    h = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+upload_cache = ResultCache()
@@ -1,38 +1,81 @@
+import numpy as np
 import pandas as pd
-from flask import jsonify
-import os
 
-def compute_sales_trend(df):
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["date"])
+from .kpi_dashboard import series_stats, kpis_from_stats
+
+
+def rolling_average(values, window=3):
+    """
+    trailing mean with a partial window at the start (min_periods=1)
+    """
+    x = np.asarray(values, dtype=np.float64)
+    csum = np.cumsum(x)
+    out = csum.copy()
+    out[window:] = csum[window:] - csum[:-window]
+    return out / np.minimum(np.arange(1, len(x) + 1), window)
 
-    monthly = (
-        df.resample("M", on="date")["sales"]
+
+def monthly_trend(dates, sales):
+    """
+    monthly totals (empty months count as zero), month over month
+    growth and a 3 month rolling average, from one grouped sum over
+    the integer month index of every row
+    """
+    months = np.asarray(dates, dtype="datetime64[ns]").astype("datetime64[M]")
+    first = months.min()
+    index = (months - first).astype(np.int64)
+    # compensated sum, same totals as resample("M").sum()
+    totals = (
+        pd.Series(sales, dtype=np.float64)
+        .groupby(index)
         .sum()
-        .reset_index()
+        .reindex(range(index.max() + 1), fill_value=0.0)
+        .to_numpy()
     )
 
-    sales = monthly["sales"].astype(float)
-
-    monthly_growth = sales.pct_change() * 100
-    monthly_growth = monthly_growth.replace([float("inf"), float("-inf")], 0)
-    monthly_growth = monthly_growth.fillna(0).round(2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.r_[np.nan, (totals[1:] / totals[:-1] - 1) * 100]
+    growth[~np.isfinite(growth)] = 0
 
-    
-    if len(sales) >= 2 and sales.iloc[-2] != 0:
-        overall_growth = ((sales.iloc[-1] - sales.iloc[-2]) / sales.iloc[-2]) * 100
+    if len(totals) >= 2 and totals[-2] != 0:
+        overall_growth = ((totals[-1] - totals[-2]) / totals[-2]) * 100
     else:
         overall_growth = 0
 
+    labels = np.arange(first, first + len(totals))
     return {
         "trend": {
-            "dates": monthly["date"].dt.strftime("%Y-%m").tolist(),
-            "sales": sales.round(2).tolist(),
-            "growth": monthly_growth.tolist()
+            "dates": np.datetime_as_string(labels, unit="M").tolist(),
+            "sales": np.round(totals, 2).tolist(),
+            "growth": np.round(growth, 2).tolist(),
+            "rolling_avg": np.round(rolling_average(totals), 2).tolist()
         },
         "kpis": {
-            "avg_sales": round(sales.mean(), 2),
-            "latest_sales": round(sales.iloc[-1], 2),
-            "growth_pct": round(overall_growth, 2)
+            "avg_sales": round(float(totals.mean()), 2),
+            "latest_sales": round(float(totals[-1]), 2),
+            "growth_pct": round(float(overall_growth), 2)
         }
-    }
\ No newline at end of file
+    }
+
+
+def sales_analytics(df, date_col="date", target="sales"):
+    """
+    everything the dashboard and report need from a sorted sales
+    series: the monthly trend, kpis and the inputs of the insights
+    """
+    sales = df[target].to_numpy(dtype=np.float64)
+    stats = series_stats(sales)
+    monthly = monthly_trend(df[date_col].to_numpy(), sales)
+    return {
+        "trend": monthly["trend"],
+        "monthly_kpis": monthly["kpis"],
+        "kpis": kpis_from_stats(stats),
+        "stats": stats
+    }
+
+
+def compute_sales_trend(df):
+    dates = df["date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    return monthly_trend(dates.to_numpy(), df["sales"].to_numpy())
@@ -1,55 +1,262 @@
 import os
-import pickle
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+import warnings
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 
+from backend.services.csv_loader import load_dashboard_view
+from backend.services.date_parsing import parse_dates
+from backend.services import model_registry
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATA_PATH = os.path.join(PROJECT_ROOT, "data", "cleaned", "clean.csv")
-MODEL_PATH = os.path.join(PROJECT_ROOT, "backend", "models", "sarima_model.pkl")
-
-print("PROJECT_ROOT:", PROJECT_ROOT)
-print("DATA_PATH:", DATA_PATH)
-print("Exists:", os.path.exists(DATA_PATH))
-
-df = pd.read_csv(DATA_PATH)
-df.columns = df.columns.str.lower().str.strip()
-
-if "order date" in df.columns:
-    df = df.rename(columns={"order date": "date"})
-elif "order_date" in df.columns:
-    df = df.rename(columns={"order_date": "date"})
-elif "ship date" in df.columns:
-    df = df.rename(columns={"ship date": "date"})
-else:
-    raise ValueError("No valid date column found")
-
-if "sales" not in df.columns:
-    raise ValueError("Sales column not found")
-
-df["date"] = pd.to_datetime(df["date"], errors="coerce")
-df = df.dropna(subset=["date", "sales"])
-df = df.groupby("date", as_index=False)["sales"].sum()
-df = df.sort_values("date")
-df.set_index("date", inplace=True)
-df = df.asfreq("D", fill_value=0)
-
-sales = df["sales"]
-
-print("Final rows:", len(sales))
-print("Duplicate dates:", sales.index.duplicated().sum())
-#sarma model
-model = SARIMAX(
-    sales,
-    order=(1, 1, 1),
-    seasonal_order=(1, 1, 1, 12),
-    enforce_stationarity=False,
-    enforce_invertibility=False
-)
-
-model_fit = model.fit(disp=False)
-
-os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-with open(MODEL_PATH, "wb") as f:
-    pickle.dump(model_fit, f)
-
-print("SARIMA model saved to:", MODEL_PATH)
\ No newline at end of file
+MODEL_PATH = model_registry.SARIMA_PATH
+STORE_PATH = os.path.join(PROJECT_ROOT, "data", "store", "clean.parquet")
+REPORT_PATH = os.path.join(model_registry.MODEL_DIR, "sarima_report.json")
+
+SEASONAL_PERIODS = (7, 12, 30)
+# quick fits whose score is this much worse than the best so far are dropped
+ABANDON_MARGIN = 0.05
+QUICK_MAXITER = 15
+
+_best = None
+
+
+def load_daily_sales(path=None):
+    """
+    daily sales series on a gap-free daily index, as used for training
+    """
+    path = path or (STORE_PATH if os.path.exists(STORE_PATH) else DATA_PATH)
+
+    if path.endswith(".parquet"):
+        # columnar copy from dataset_store, no CSV parsing needed
+        df = load_dashboard_view(path).rename(columns={"order_date": "date"})
+    else:
+        df = pd.read_csv(path)
+        df.columns = df.columns.str.lower().str.strip()
+
+        if "order date" in df.columns:
+            df = df.rename(columns={"order date": "date"})
+        elif "order_date" in df.columns:
+            df = df.rename(columns={"order_date": "date"})
+        elif "ship date" in df.columns:
+            df = df.rename(columns={"ship date": "date"})
+        else:
+            raise ValueError("No valid date column found")
+
+        if "sales" not in df.columns:
+            raise ValueError("Sales column not found")
+
+    df["date"], dates = parse_dates(df["date"], dayfirst=False)
+    if dates["bad_rows"]:
+        print(f"skipped {dates['bad_rows']} rows with unparseable dates, e.g. {dates['examples']}")
+    df = df.dropna(subset=["date", "sales"])
+    df = df.groupby("date", as_index=False)["sales"].sum()
+    df = df.sort_values("date")
+    df.set_index("date", inplace=True)
+    df = df.asfreq("D", fill_value=0)
+
+    return df["sales"]
+
+
+def candidate_orders(seasonal_periods=SEASONAL_PERIODS, max_pq=1, d=1, max_seasonal_pq=1, seasonal_d=1):
+    for p, q in itertools.product(range(max_pq + 1), repeat=2):
+        for P, Q in itertools.product(range(max_seasonal_pq + 1), repeat=2):
+            for s in seasonal_periods:
+                yield (p, d, q), (P, seasonal_d, Q, s)
+
+
+def _fit(series, order, seasonal_order, maxiter=50, start_params=None):
+    model = SARIMAX(
+        series,
+        order=order,
+        seasonal_order=seasonal_order,
+        enforce_stationarity=False,
+        enforce_invertibility=False
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return model.fit(disp=False, maxiter=maxiter, start_params=start_params)
+
+
+def _init_worker(best):
+    global _best
+    _best = best
+
+
+def _abandon(score):
+    # margin on the magnitude, AIC is often negative on scaled series
+    if _best is None or not np.isfinite(_best.value):
+        return False
+    best = _best.value
+    return score > best + abs(best) * ABANDON_MARGIN
+
+
+def _publish(score):
+    if _best is None:
+        return
+    with _best.get_lock():
+        if score < _best.value:
+            _best.value = score
+
+
+def _evaluate(series, order, seasonal_order, scoring, folds, horizon):
+    """
+    pool worker: scores one candidate by AIC or rolling-origin
+    backtest MAE, giving up early once it cannot win
+    """
+    start = time.perf_counter()
+    result = {"order": order, "seasonal_order": seasonal_order, "status": "ok"}
+
+    try:
+        if scoring == "aic":
+            quick = _fit(series, order, seasonal_order, maxiter=QUICK_MAXITER)
+            # AIC of an unconverged fit is a loose upper bound, good enough to drop losers
+            if _abandon(quick.aic):
+                result.update(status="abandoned", score=float(quick.aic))
+            else:
+                fit = _fit(series, order, seasonal_order, start_params=quick.params)
+                result.update(score=float(fit.aic), aic=float(fit.aic), params=fit.params.tolist())
+        else:
+            errors = []
+            for k in range(folds, 0, -1):
+                origin = len(series) - k * horizon
+                fit = _fit(series.iloc[:origin], order, seasonal_order)
+                pred = fit.forecast(steps=horizon)
+                actual = series.iloc[origin:origin + horizon]
+                errors.append(float(np.mean(np.abs(actual.values - pred.values))))
+                if _abandon(np.mean(errors)):
+                    result["status"] = "abandoned"
+                    break
+            result.update(score=float(np.mean(errors)), fold_mae=errors)
+
+        if result["status"] == "ok":
+            _publish(result["score"])
+
+    except Exception as e:
+        result.update(status="failed", error=str(e), score=float("inf"))
+
+    result["fit_time_s"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def search(series, candidates, scoring="aic", jobs=None, folds=3, horizon=30):
+    best = multiprocessing.Value("d", float("inf"))
+    results = []
+
+    with ProcessPoolExecutor(
+        max_workers=jobs or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(best,)
+    ) as pool:
+        futures = [
+            pool.submit(_evaluate, series, order, seasonal_order, scoring, folds, horizon)
+            for order, seasonal_order in candidates
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(
+                f"{result['order']}x{result['seasonal_order']}: "
+                f"{result['status']} score={result['score']:.3f} ({result['fit_time_s']}s)"
+            )
+
+    return sorted(results, key=lambda r: (r["status"] != "ok", r["score"]))
+
+
+def train(data=None, seasonal_periods=SEASONAL_PERIODS, max_pq=1, max_seasonal_pq=1,
+          scoring="aic", jobs=None, folds=3, horizon=30, order=None, seasonal_order=None):
+    """
+    searches SARIMA orders in parallel, refits the winner on the full
+    history and saves it with its metadata and a fit-time report
+    """
+    series = load_daily_sales(data)
+    started = time.perf_counter()
+
+    if order and seasonal_order:
+        results = [{"order": tuple(order), "seasonal_order": tuple(seasonal_order), "status": "fixed"}]
+    else:
+        candidates = list(candidate_orders(seasonal_periods, max_pq, 1, max_seasonal_pq, 1))
+        results = search(series, candidates, scoring, jobs, folds, horizon)
+        results = [r for r in results if r["status"] == "ok"] + [r for r in results if r["status"] != "ok"]
+        if results[0]["status"] != "ok":
+            raise RuntimeError("No SARIMA candidate could be fitted")
+
+    winner = results[0]
+    fit_start = time.perf_counter()
+    model_fit = _fit(
+        series,
+        tuple(winner["order"]),
+        tuple(winner["seasonal_order"]),
+        start_params=winner.get("params")
+    )
+    final_fit_time = time.perf_counter() - fit_start
+
+    model_registry.store("sarima", model_fit)
+
+    meta = {
+        "order": list(winner["order"]),
+        "seasonal_order": list(winner["seasonal_order"]),
+        "scoring": scoring,
+        "score": winner.get("score"),
+        "aic": float(model_fit.aic),
+        "nobs": int(model_fit.nobs),
+        "last_observation": str(series.index[-1].date()),
+        "trained_at": time.time(),
+        "last_refit": time.time()
+    }
+    # the server may be reading the metadata while training runs
+    model_registry.save_meta(meta)
+
+    report = {
+        "meta": meta,
+        "search_time_s": round(fit_start - started, 3),
+        "final_fit_time_s": round(final_fit_time, 3),
+        "candidates": [
+            {k: v for k, v in r.items() if k != "params"} for r in results
+        ]
+    }
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=1, default=str)
+
+    return meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the SARIMA sales model")
+    parser.add_argument("--data", help="CSV or dataset_store .parquet, defaults to data/cleaned/clean.csv")
+    parser.add_argument("--seasonal-periods", type=int, nargs="+", default=list(SEASONAL_PERIODS))
+    parser.add_argument("--max-pq", type=int, default=1, help="largest non-seasonal p and q to try")
+    parser.add_argument("--max-seasonal-pq", type=int, default=1, help="largest seasonal P and Q to try")
+    parser.add_argument("--scoring", choices=["aic", "backtest"], default="aic")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, defaults to all cores")
+    parser.add_argument("--folds", type=int, default=3, help="backtest folds")
+    parser.add_argument("--horizon", type=int, default=30, help="backtest horizon in days")
+    parser.add_argument("--order", type=int, nargs=3, help="skip the search and fit this (p, d, q)")
+    parser.add_argument("--seasonal-order", type=int, nargs=4, help="with --order, the (P, D, Q, s)")
+    args = parser.parse_args(argv)
+
+    meta = train(
+        data=args.data,
+        seasonal_periods=args.seasonal_periods,
+        max_pq=args.max_pq,
+        max_seasonal_pq=args.max_seasonal_pq,
+        scoring=args.scoring,
+        jobs=args.jobs,
+        folds=args.folds,
+        horizon=args.horizon,
+        order=args.order,
+        seasonal_order=args.seasonal_order
+    )
+    print("SARIMA model saved to:", MODEL_PATH)
+    print(json.dumps(meta, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,98 @@
 import os
-import pickle
+import time
+import zlib
+import threading
 import pandas as pd
 from datetime import timedelta
 from flask import jsonify
 import numpy as np
 
-#load the model
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "models", "sarima_model.pkl")
+from . import model_registry
+from . import metrics
+from .csv_loader import load_base_csv, load_dashboard_view
+from .date_parsing import parse_dates
+from .result_cache import ResultCache
 
-with open(MODEL_PATH, "rb") as f:
-    model_fit = pickle.load(f)
+# full refit once the stored fit is older than this, or when new data drifts
+REFIT_INTERVAL_DAYS = float(os.environ.get("SPARKSALES_SARIMA_REFIT_DAYS", 30))
+# ratio of one-step error on appended data to the in-sample error
+DRIFT_THRESHOLD = float(os.environ.get("SPARKSALES_SARIMA_DRIFT", 1.5))
 
-last_date = model_fit.data.dates[-1]
-def forecast_sarima(request):
-    global last_date
+_update_lock = threading.Lock()
+
+# longest forecast per (model version, origin), and finished responses
+_horizons = ResultCache(max_entries=16, ttl=24 * 3600)
+_responses = ResultCache(max_entries=512, ttl=24 * 3600)
+
+
+def _base_forecast(model_fit, version, origin, steps):
+    """
+    noise-free forecast, the longest horizon computed per
+    (model version, origin) serves every shorter one as a prefix
+    """
+    key = (version, origin)
+    cached = _horizons.get(key)
+    if cached is None or len(cached) < steps:
+        cached = np.asarray(model_fit.forecast(steps=steps), dtype=float)
+        _horizons.set(key, cached)
+    return cached[:steps]
+
+
+def _seed(version, origin, steps):
+    return zlib.crc32(f"{version}|{origin}|{steps}".encode())
+
+
+def _query_int(request, name, default, minimum):
+    """
+    an integer query parameter, ValueError with a message when it is
+    not an integer or below minimum
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {value}")
+    return value
 
+
+def forecast_sarima(request):
     try:
-        steps = int(request.args.get("steps", 7))
-        last_date = last_date + timedelta(days=1)
+        try:
+            steps = _query_int(request, "steps", 7, 1)
+            seed = _query_int(request, "seed", None, 0)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        model_fit = model_registry.get_sarima()
+        version = model_registry.model_version("sarima")
+
+        # forecasts always start the day after the last observation
+        start = model_fit.data.dates[-1] + timedelta(days=1)
+        origin = str(start.date())
+
+        # noise is seeded per request so identical requests get identical answers
+        if seed is None:
+            seed = _seed(version, origin, steps)
+
+        response_key = (version, origin, steps, seed)
+        cached = _responses.get(response_key)
+        if cached is not None:
+            return jsonify(cached)
 
         future_dates = pd.date_range(
-            start=last_date,
+            start=start,
             periods=steps,
             freq="D"
         )
-        forecast = model_fit.forecast(steps=steps)
+        with metrics.stage("sarima.forecast", rows=steps):
+            forecast = pd.Series(_base_forecast(model_fit, version, origin, steps))
 
         #noise is added for depicting changes in the graph 
-        noise = np.random.normal(
+        noise = np.random.default_rng(seed).normal(
             0,
             forecast.std() * 0.12,
             size=len(forecast)
@@ -55,12 +119,111 @@ def forecast_sarima(request):
             f"Step {i+1}: {round(val, 3)}"
             for i, val in enumerate(forecast_vals)
         ]
-        return jsonify({
+        result = {
             "future_dates": future_dates.strftime("%Y-%m-%d").tolist(),
             "forecast": forecast_vals.tolist(),
             "steps_breakdown": steps_list,
-            "insight": f"Trend detected: {trend}. {insight}"
+            "insight": f"Trend detected: {trend}. {insight}",
+            "seed": seed
+        }
+        _responses.set(response_key, result)
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _observations(request):
+    """
+    daily sales from a JSON body {"observations": [{"date", "sales"}]}
+    or from an uploaded CSV
+    """
+    if "file" in request.files:
+        df = load_dashboard_view(load_base_csv(request.files["file"]))
+        df = df.rename(columns={"order_date": "date"})
+    else:
+        data = request.get_json(silent=True) or {}
+        df = pd.DataFrame(data.get("observations", []))
+        if df.empty or "date" not in df.columns or "sales" not in df.columns:
+            raise ValueError("Expected observations with date and sales")
+        df["date"], _ = parse_dates(df["date"], dayfirst=False)
+        df["sales"] = pd.to_numeric(df["sales"], errors="coerce")
+        df = df.dropna(subset=["date", "sales"])
+        df = df.groupby("date", as_index=False)["sales"].sum()
+
+    return df.set_index("date")["sales"].sort_index()
+
+
+def _drift(model_fit, updated, n_new):
+    """
+    one-step-ahead error on the appended days relative to the
+    in-sample one-step error of the existing fit
+    """
+    burn = model_fit.loglikelihood_burn
+    base = np.abs(np.asarray(model_fit.resid)[burn:]).mean()
+    recent = np.abs(np.asarray(updated.resid)[-n_new:]).mean()
+    return float(recent / base) if base else 0.0
+
+
+def update_sarima(request):
+    """
+    appends newly observed daily sales to the fitted state with the
+    existing parameters, refitting only on schedule or on drift
+    """
+    try:
+        observed = _observations(request)
+
+        with _update_lock:
+            model_fit = model_registry.get_sarima()
+            last = model_fit.data.dates[-1]
+
+            observed = observed[observed.index > last]
+            if observed.empty:
+                return jsonify({"error": f"No observations after {last.date()}"}), 400
+
+            # same daily grid as training, days without sales count as zero
+            new = observed.reindex(
+                pd.date_range(last + timedelta(days=1), observed.index[-1], freq="D"),
+                fill_value=0.0
+            )
+
+            meta = model_registry.load_meta()
+            with metrics.stage("sarima.append", rows=len(new)):
+                updated = model_fit.append(new, refit=False)
+            drift = _drift(model_fit, updated, len(new))
+
+            last_refit = meta.get("last_refit", os.path.getmtime(model_registry.SARIMA_PATH))
+            refit_due = (time.time() - last_refit) / 86400 > REFIT_INTERVAL_DAYS
+            refit = refit_due or drift > DRIFT_THRESHOLD
+
+            if refit:
+                with metrics.stage("sarima.refit", rows=len(new)):
+                    updated = model_fit.append(
+                        new,
+                        refit=True,
+                        fit_kwargs={"disp": False, "start_params": model_fit.params}
+                    )
+                meta["last_refit"] = time.time()
+
+            model_registry.store("sarima", updated)
+            meta.update({
+                "last_refit": meta.get("last_refit", last_refit),
+                "last_update": time.time(),
+                "last_observation": str(updated.data.dates[-1].date()),
+                "nobs": int(updated.nobs),
+                "drift": round(drift, 4)
+            })
+            model_registry.save_meta(meta)
+
+        return jsonify({
+            "appended_days": len(new),
+            "last_observation": meta["last_observation"],
+            "drift": meta["drift"],
+            "refit": bool(refit),
+            "refit_reason": ("schedule" if refit_due else "drift") if refit else None
         })
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .csv_loader import (
+    SEGMENT_COLS,
+    load_base_csv,
+    load_daily_csv,
+    date_report,
+    upload_size,
+    STREAMING_THRESHOLD_BYTES
+)
+from .result_cache import nbytes
+from . import metrics
+
+# above this many cells the cube is kept as a sparse matrix
+DENSE_LIMIT = 50_000_000
+
+
+class SegmentCube:
+    """
+    daily sales over (date x region x category x sub_category),
+    stored as a dates x observed-segments matrix so any slice,
+    including "all" at any level, is a reduction over dates
+    """
+
+    def __init__(self, dates, segments, sales, counts):
+        self.dates = dates
+        self.segments = segments
+        self.sales = sales
+        self.counts = counts
+        # set by the loader when some dates could not be parsed
+        self.date_report = None
+
+    @property
+    def nbytes(self):
+        return sum(nbytes(part) for part in (self.dates, self.segments, self.sales, self.counts))
+
+    @classmethod
+    def from_frame(cls, df, date_col="order_date"):
+        for col in SEGMENT_COLS:
+            if col not in df.columns:
+                raise ValueError(f"Missing required segmentation column: {col}")
+
+        date_codes, dates = pd.factorize(df[date_col], sort=True)
+        seg_codes, segments = pd.MultiIndex.from_frame(
+            df[SEGMENT_COLS].astype(object)
+        ).factorize(sort=True)
+
+        n_dates, n_segments = len(dates), len(segments)
+        values = pd.to_numeric(df["sales"], errors="coerce").fillna(0).to_numpy(np.float64)
+
+        if n_dates * n_segments <= DENSE_LIMIT:
+            flat = date_codes * n_segments + seg_codes
+            size = n_dates * n_segments
+            sales = np.bincount(flat, weights=values, minlength=size).reshape(n_dates, n_segments)
+            counts = np.bincount(flat, minlength=size).reshape(n_dates, n_segments)
+        else:
+            shape = (n_dates, n_segments)
+            sales = sparse.csc_matrix((values, (date_codes, seg_codes)), shape=shape)
+            counts = sparse.csc_matrix((np.ones(len(values)), (date_codes, seg_codes)), shape=shape)
+
+        return cls(pd.DatetimeIndex(dates), pd.DataFrame(list(segments), columns=SEGMENT_COLS), sales, counts)
+
+    def mask(self, region=None, category=None, sub_category=None):
+        keep = np.ones(len(self.segments), dtype=bool)
+        for col, value in zip(SEGMENT_COLS, (region, category, sub_category)):
+            if value:
+                keep &= (self.segments[col] == value).to_numpy()
+        return keep
+
+    def _reduce(self, matrix, cols):
+        if sparse.issparse(matrix):
+            return np.asarray(matrix[:, cols].sum(axis=1)).ravel()
+        return matrix[:, cols].sum(axis=1)
+
+    def series(self, region=None, category=None, sub_category=None):
+        """
+        daily sales of one slice, only dates with orders in it
+        """
+        cols = np.flatnonzero(self.mask(region, category, sub_category))
+        sales = self._reduce(self.sales, cols)
+        present = self._reduce(self.counts, cols) > 0
+
+        return pd.DataFrame({
+            "order_date": self.dates[present],
+            "sales": sales[present]
+        })
+
+
+def cube_from_upload(file):
+    """
+    reads an upload (streamed when large) straight into a SegmentCube
+    """
+    size = upload_size(file)
+    with metrics.stage("segmented.read_csv", nbytes=size) as s:
+        if size > STREAMING_THRESHOLD_BYTES:
+            df = load_daily_csv(file)
+        else:
+            df = load_base_csv(file)
+        s.rows = len(df)
+    with metrics.stage("segmented.cube", rows=len(df)):
+        cube = SegmentCube.from_frame(df)
+    cube.date_report = date_report(df)
+    return cube
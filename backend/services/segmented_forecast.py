@@ -1,102 +1,361 @@
 import os
-import joblib
+import json
+import threading
+import multiprocessing
+import numpy as np
 import pandas as pd
-from flask import jsonify, request
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask import Response, jsonify, request, stream_with_context
 
-from .csv_loader import load_base_csv, load_segmented_view
-from .featureeng import create_time_features, create_lag_features
+from .segment_cube import cube_from_upload
+from .kpi_dashboard import series_stats
+from .featureeng import valid_rows
+from .horizon_forecast import horizon_error, recursive_forecast
+from . import model_registry
+from .model_bank import bank
+from . import metrics
+from .result_cache import upload_cache, file_digest
+from . import datasets
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "models", "sales_forecast.pkl")
-FEATURES_PATH = os.path.join(BASE_DIR, "models", "feature_cols.pkl")
+SEGMENT_WORKERS = int(os.environ.get("SPARKSALES_SEGMENT_WORKERS", os.cpu_count() or 1))
+# below this many segments the pool costs more than it saves
+MIN_PARALLEL_SEGMENTS = 16
+DEFAULT_HORIZON = 5
+MAX_HORIZON = 365
 
-model = joblib.load(MODEL_PATH)
-feature_cols = joblib.load(FEATURES_PATH)
+_pool = None
+_pool_lock = threading.Lock()
 
 
-CACHED_DF = None
+def load_cube(file, digest):
+    """
+    daily sales cube, built once per upload and shared across filter changes
+    """
+    cube_key = (digest, "cube")
+    cube = upload_cache.get(cube_key)
+    if cube is None:
+        cube = cube_from_upload(file)
+        upload_cache.set(cube_key, cube)
+    return cube
+
+
+def _source(request):
+    """
+    (digest, cube loader) for a dataset_id or an uploaded file,
+    raises LookupError for unknown datasets and ValueError without either
+    """
+    dataset_id = datasets.requested_id(request)
+    if dataset_id is not None:
+        dataset = datasets.store.get(dataset_id)
+        if dataset is None:
+            raise LookupError(dataset_id)
+        return dataset["id"], lambda: datasets.view(dataset, "segments")
+
+    if "file" not in request.files:
+        raise ValueError("CSV file or dataset_id required")
+
+    file = request.files["file"]
+    digest = file_digest(file)
+    return digest, lambda: load_cube(file, digest)
+
+
+def segment_kpis(df):
+    stats = series_stats(df["sales"].to_numpy())
+    if stats["count"] >= 2 and stats["previous"] != 0:
+        sales_growth_pct = round(
+            ((stats["latest"] - stats["previous"]) / stats["previous"]) * 100,2)
+    else:
+        sales_growth_pct = 0.0
+    mean_sales = stats["mean"]
+    std_sales = stats["std"]
+
+    if mean_sales == 0:
+        volatility_level = "Low"
+    else:
+        cv = std_sales / mean_sales
+        if cv > 0.5:
+            volatility_level = "High"
+        elif cv > 0.25:
+            volatility_level = "Medium"
+        else:
+            volatility_level = "Low"
+    return {
+            "latest_sales": round(stats["latest"], 2),
+            "avg_sales": round(float(mean_sales), 2),
+            "sales_growth_pct": float(sales_growth_pct),
+            "volatility_level": volatility_level
+    }
+
+
+def requested_horizon(request):
+    horizon = int(request.form.get("horizon") or request.args.get("horizon") or DEFAULT_HORIZON)
+    return min(max(horizon, 1), MAX_HORIZON)
 
 
 def segment_forecast(request):
     try:
-        if "file" not in request.files:
-            return jsonify({"error": "CSV file required"}), 400
-        
-        df = load_base_csv(request.files["file"])
+        try:
+            digest, get_cube = _source(request)
+        except LookupError as e:
+            return datasets.unknown(e.args[0])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         region = request.form.get("region") or None
         category = request.form.get("category") or None
         sub_category = request.form.get("sub_category") or None
+        horizon = requested_horizon(request)
 
-        df = load_segmented_view(df, region, category, sub_category)
+        response_key = (
+            digest,
+            "forecast_segmented",
+            (region, category, sub_category, horizon),
+            model_registry.model_version(),
+            bank.version()
+        )
+        cached = upload_cache.get(response_key)
+        if cached is not None:
+            return jsonify(cached)
+
+        try:
+            cube = get_cube()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # daily totals of the selected slice
+        with metrics.stage("segmented.slice") as s:
+            df = cube.series(region, category, sub_category)
+            s.rows = len(df)
 
         if df.empty:
             return jsonify({"error": "No data for selected segment"}), 400
 
-        df = create_time_features(df)
-        df = create_lag_features(df, target="sales")
-        df = df.dropna()
+        history = df["sales"].to_numpy()[None, -3:]
+        last_date = df["order_date"].iloc[-1:]
+
+        # the trend and kpis cover the periods the model has features for
+        df = df[valid_rows(len(df))]
 
         if df.empty:
             return jsonify({"error": "Insufficient data after feature engineering"}), 400
 
-        model_features = [
-            col for col in feature_cols
-            if col in df.columns and pd.api.types.is_numeric_dtype(df[col])
-        ]
+        # the segment's own model when one was trained, else the global one
+        model, source = bank.predictor((region, category, sub_category))
+        feature_cols = model_registry.get_feature_cols()
+        if source == "global":
+            error = horizon_error(model_registry.rolling_closed(), horizon)
+            if error:
+                return jsonify({"error": error}), 400
 
-        X = df[model_features]
+        trend = {
+            "dates": df["order_date"].astype(str).tolist(),
+            "sales": df["sales"].round(2).tolist()
+        }
 
-        df["predicted_sales"] = model.predict(X)
+        with metrics.stage("segmented.predict", rows=horizon):
+            predictions, _ = recursive_forecast(model, feature_cols, history, last_date, horizon)
+        forecast_quantity = [round(float(v), 2) for v in predictions[0]]
 
-        trend_df = (
-            df.groupby("order_date", as_index=False)["sales"]
-              .sum()
-              .sort_values("order_date")
-        )
+        kpis = segment_kpis(df)
+
+        result = {
+            "forecast_type": "Segment-wise Sales Forecast",
+            "trend": trend,
+            "forecast_quantity": forecast_quantity,
+            "kpis": kpis,
+            "model_source": source
+        }
+        if cube.date_report and cube.date_report["bad_rows"]:
+            result["date_report"] = cube.date_report
+        upload_cache.set(response_key, result)
+        with metrics.stage("segmented.jsonify"):
+            return jsonify(result)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _segment_features(items):
+    """
+    pool worker: trend and kpis for a chunk of segment series, returns
+    the recent history of each so the parent can roll the whole chunk
+    forward in lockstep (the cube series are already daily totals, the
+    forecast builds its own features from the last values)
+    """
+    out = []
+    for key, dates, sales in items:
+        df = pd.DataFrame({"order_date": dates, "sales": sales})
+        df = df[valid_rows(len(df))]
+
+        if df.empty:
+            out.append((key, None, None, None, None))
+            continue
 
         trend = {
-            "dates": trend_df["order_date"].astype(str).tolist(),
-            "sales": trend_df["sales"].round(2).tolist()
+            "dates": df["order_date"].astype(str).tolist(),
+            "sales": df["sales"].round(2).tolist()
         }
+        out.append((key, sales[-3:], dates[-1], trend, segment_kpis(df)))
+    return out
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawned like executors._process_pool, the server is multithreaded
+            _pool = ProcessPoolExecutor(
+                max_workers=SEGMENT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
 
-        last_pred = df["predicted_sales"].iloc[-1]
-        forecast_quantity = [
-            round(last_pred * (1 + 0.03 * i), 2)
-            for i in range(1, 6)
+def _requested_segments(request, cube):
+    """
+    every observed (region, category, sub_category), or the subset
+    given as a JSON list in the "segments" form field
+    """
+    raw = request.form.get("segments")
+    if raw:
+        wanted = json.loads(raw)
+        return [
+            tuple(item.get(col) or None for col in ("region", "category", "sub_category"))
+            for item in wanted
         ]
 
-        if len(df) >= 2 and df["sales"].iloc[-2] != 0:
-            sales_growth_pct = round(
-                ((df["sales"].iloc[-1] - df["sales"].iloc[-2]) / df["sales"].iloc[-2]) * 100,2)
-        else:
-            sales_growth_pct = 0.0
-        mean_sales = df["sales"].mean()
-        std_sales = df["sales"].std()
+    region = request.form.get("region") or None
+    category = request.form.get("category") or None
+    sub_category = request.form.get("sub_category") or None
+    segments = cube.segments[cube.mask(region, category, sub_category)]
+    return [tuple(row) for row in segments.itertuples(index=False)]
 
-        if mean_sales == 0:
-            volatility_level = "Low"
+
+def _forecast_chunks(cube, segments, horizon=DEFAULT_HORIZON, lockstep=False):
+    """
+    yields one list of per-segment results per finished chunk, or a
+    single list when lockstep is set so every segment shares one
+    predict call per horizon step
+    """
+    model = model_registry.get_predictor()
+    feature_cols = model_registry.get_feature_cols()
+    global_error = horizon_error(model_registry.rolling_closed(), horizon)
+
+    items = []
+    empty = []
+    for key in segments:
+        series = cube.series(*key)
+        if series.empty:
+            empty.append(key)
         else:
-            cv = std_sales / mean_sales
-            if cv > 0.5:
-                volatility_level = "High"
-            elif cv > 0.25:
-                volatility_level = "Medium"
+            items.append((key, series["order_date"].to_numpy(), series["sales"].to_numpy()))
+
+    if empty:
+        yield [(key, {"error": "No data for selected segment"}) for key in empty]
+
+    if len(items) < MIN_PARALLEL_SEGMENTS or SEGMENT_WORKERS <= 1:
+        with metrics.stage("segmented_all.features", rows=sum(len(item[2]) for item in items)):
+            chunks = [_segment_features(items)] if items else []
+    else:
+        size = max(1, -(-len(items) // (SEGMENT_WORKERS * 4)))
+        pool = _get_pool()
+        futures = [
+            pool.submit(_segment_features, items[i:i + size])
+            for i in range(0, len(items), size)
+        ]
+        chunks = (f.result() for f in as_completed(futures))
+        if lockstep:
+            chunks = [[row for chunk in chunks for row in chunk]]
+
+    for chunk in chunks:
+        ready = [row for row in chunk if row[1] is not None]
+        results = [
+            (row[0], {"error": "Insufficient data after feature engineering"})
+            for row in chunk if row[1] is None
+        ]
+        # segments with their own model roll forward per model, the
+        # rest share the global model in lockstep
+        groups = {}
+        for row in ready:
+            segment_model = bank.get(row[0])
+            if segment_model is None and global_error:
+                results.append((row[0], {"error": global_error}))
+            elif segment_model is None:
+                groups.setdefault(None, (model, "global", []))[2].append(row)
             else:
-                volatility_level = "Low"
-        kpis = {
-                "latest_sales": round(df["sales"].iloc[-1], 2),
-                "avg_sales": round(mean_sales, 2),
-                "sales_growth_pct": sales_growth_pct,
-                "volatility_level": volatility_level
-        }
+                groups[row[0]] = (segment_model, "segment", [row])
 
-        return jsonify({
+        for group_model, source, rows in groups.values():
+            with metrics.stage("segmented_all.predict", rows=len(rows) * horizon):
+                predictions, _ = recursive_forecast(
+                    group_model,
+                    feature_cols,
+                    np.vstack([row[1] for row in rows]),
+                    [row[2] for row in rows],
+                    horizon
+                )
+            for (key, _, _, trend, kpis), pred in zip(rows, predictions):
+                results.append((key, {
+                    "trend": trend,
+                    "forecast_quantity": [round(float(v), 2) for v in pred],
+                    "kpis": kpis,
+                    "model_source": source
+                }))
+        yield results
+
+
+def _with_key(key, result):
+    return {
+        "region": key[0],
+        "category": key[1],
+        "sub_category": key[2],
+        **result
+    }
+
+
+def segment_forecast_all(request):
+    """
+    forecasts every segment combination (or a requested subset)
+    from a single upload, as one response or an NDJSON stream
+    """
+    try:
+        try:
+            _, get_cube = _source(request)
+            cube = get_cube()
+        except LookupError as e:
+            return datasets.unknown(e.args[0])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        segments = _requested_segments(request, cube)
+        horizon = requested_horizon(request)
+
+        stream = (
+            request.args.get("stream") == "1"
+            or "ndjson" in request.headers.get("Accept", "")
+        )
+        if stream:
+            def generate():
+                for results in _forecast_chunks(cube, segments, horizon):
+                    for key, result in results:
+                        yield json.dumps(_with_key(key, result)) + "\n"
+
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+        order = {key: i for i, key in enumerate(segments)}
+        combined = [
+            row for results in _forecast_chunks(cube, segments, horizon, lockstep=True)
+            for row in results
+        ]
+        combined.sort(key=lambda row: order[row[0]])
+
+        result = {
             "forecast_type": "Segment-wise Sales Forecast",
-            "trend": trend,
-            "forecast_quantity": forecast_quantity,
-            "kpis": kpis
-        })
+            "segments": [_with_key(key, result) for key, result in combined]
+        }
+        if cube.date_report and cube.date_report["bad_rows"]:
+            result["date_report"] = cube.date_report
+        with metrics.stage("segmented_all.jsonify", rows=len(combined)):
+            return jsonify(result)
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
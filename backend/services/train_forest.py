@@ -0,0 +1,74 @@
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from backend.services.backtest import MONTHLY_PATH, DEFAULT_FEATURE_COLS, load_monthly
+from backend.services.featureeng import feature_matrix
+from backend.services.horizon_forecast import SERVED_CLOSED
+from backend.services import model_registry
+
+# the notebook forest (notebooks/models.ipynb)
+FOREST_PARAMS = {"n_estimators": 200, "random_state": 42}
+# last share of the rows held out to score the fit before the final refit
+TEST_SIZE = 0.2
+
+
+def train(data=MONTHLY_PATH, params=None, test_size=TEST_SIZE, feature_cols=DEFAULT_FEATURE_COLS):
+    """
+    fits the global forest on the monthly series with the rolling window
+    recursive_forecast serves (closed="left", the notebook used pandas'
+    right-closed default), scores a chronological holdout, refits on
+    every row and saves the model, its feature columns and metadata
+    """
+    params = {**FOREST_PARAMS, **(params or {})}
+    feature_cols = list(feature_cols)
+    started = time.perf_counter()
+
+    dates, values = load_monthly(data)
+    X, valid = feature_matrix(dates, values, feature_cols, closed=SERVED_CLOSED)
+    X = pd.DataFrame(X[valid], columns=feature_cols)
+    y = values[valid]
+
+    cut = int(len(y) * (1 - test_size))
+    holdout = RandomForestRegressor(**params).fit(X.iloc[:cut], y[:cut])
+    holdout_mae = float(np.abs(holdout.predict(X.iloc[cut:]) - y[cut:]).mean())
+
+    model = RandomForestRegressor(**params).fit(X, y)
+
+    meta = {
+        "trained_at": time.time(),
+        "data": data,
+        "feature_cols": feature_cols,
+        "rolling_closed": SERVED_CLOSED,
+        "params": params,
+        "rows": len(y),
+        "holdout_rows": len(y) - cut,
+        "holdout_mae": round(holdout_mae, 2),
+        "last_observation": str(pd.Timestamp(dates[-1]).date()),
+        "train_time_s": round(time.perf_counter() - started, 3)
+    }
+    # metadata first, a server reloading the new forest reads its window with it
+    model_registry.save_meta(meta, model_registry.FOREST_META_PATH)
+    model_registry.store("feature_cols", feature_cols)
+    model_registry.store("sales_forecast", model)
+    return meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the global Random Forest sales model")
+    parser.add_argument("--data", default=MONTHLY_PATH, help="monthly CSV with Order Date and Sales")
+    parser.add_argument("--trees", type=int, default=FOREST_PARAMS["n_estimators"])
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE,
+                        help="share of the last rows scored before the final refit")
+    args = parser.parse_args(argv)
+
+    meta = train(data=args.data, params={"n_estimators": args.trees}, test_size=args.test_size)
+    print("forest saved to:", model_registry.MODEL_PATH)
+    print(json.dumps(meta, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+production entry point
+
+    gunicorn -c backend/gunicorn.conf.py
+"""
+from backend.app import app
+from backend.services import model_registry
+
+# loaded once in the gunicorn master (preload_app), forked workers
+# share the model pages instead of each reading the pickles
+model_registry.preload()
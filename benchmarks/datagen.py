@@ -0,0 +1,127 @@
+"""
+synthetic order tables shaped like data/raw/train.csv
+
+    python -m benchmarks.datagen --rows 1000000 --out data/bench/superstore_1m.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.join("data", "bench")
+CHUNK_ROWS = 500_000
+
+COLUMNS = [
+    "Row ID", "Order ID", "Order Date", "Ship Date", "Ship Mode", "Customer ID",
+    "Customer Name", "Segment", "Country", "City", "State", "Postal Code",
+    "Region", "Product ID", "Category", "Sub-Category", "Product Name", "Sales"
+]
+
+SUB_CATEGORIES = {
+    "Furniture": ["Bookcases", "Chairs", "Tables", "Furnishings"],
+    "Office Supplies": [
+        "Labels", "Storage", "Art", "Binders", "Appliances",
+        "Paper", "Envelopes", "Fasteners", "Supplies"
+    ],
+    "Technology": ["Phones", "Accessories", "Machines", "Copiers"],
+}
+REGIONS = {
+    "South": [("Henderson", "Kentucky", "42420"), ("Fort Lauderdale", "Florida", "33311")],
+    "West": [("Los Angeles", "California", "90036"), ("Seattle", "Washington", "98103")],
+    "Central": [("Houston", "Texas", "77095"), ("Chicago", "Illinois", "60610")],
+    "East": [("New York City", "New York", "10024"), ("Philadelphia", "Pennsylvania", "19140")],
+}
+SHIP_MODES = ["Standard Class", "Second Class", "First Class", "Same Day"]
+SEGMENTS = ["Consumer", "Corporate", "Home Office"]
+
+# log-normal fitted to the sales column of train.csv
+SALES_MU = 4.11
+SALES_SIGMA = 1.65
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def _pools():
+    products = [
+        (category, sub) for category, subs in SUB_CATEGORIES.items() for sub in subs
+    ]
+    places = [(region, *place) for region, places in REGIONS.items() for place in places]
+    return products, places
+
+
+def _chunk(rng, start_row, rows, days, products, places):
+    day = rng.integers(0, len(days), rows)
+    ship = np.minimum(day + rng.integers(0, 7, rows), len(days) - 1)
+    product = rng.integers(0, len(products), rows)
+    place = rng.integers(0, len(places), rows)
+    customer = rng.integers(10000, 99999, rows)
+
+    product_cols = np.array(products, dtype=object)[product]
+    place_cols = np.array(places, dtype=object)[place]
+    ids = np.arange(start_row + 1, start_row + rows + 1)
+
+    return pd.DataFrame({
+        "Row ID": ids,
+        "Order ID": "CA-" + pd.Series(ids // 3 + 100000).astype(str),
+        "Order Date": days[day],
+        "Ship Date": days[ship],
+        "Ship Mode": np.array(SHIP_MODES, dtype=object)[rng.integers(0, len(SHIP_MODES), rows)],
+        "Customer ID": "CG-" + pd.Series(customer).astype(str),
+        "Customer Name": "Customer " + pd.Series(customer).astype(str),
+        "Segment": np.array(SEGMENTS, dtype=object)[rng.integers(0, len(SEGMENTS), rows)],
+        "Country": "United States",
+        "City": place_cols[:, 1],
+        "State": place_cols[:, 2],
+        "Postal Code": place_cols[:, 3],
+        "Region": place_cols[:, 0],
+        "Product ID": "PRD-" + pd.Series(product).astype(str),
+        "Category": product_cols[:, 0],
+        "Sub-Category": product_cols[:, 1],
+        "Product Name": "Product " + pd.Series(product).astype(str),
+        "Sales": rng.lognormal(SALES_MU, SALES_SIGMA, rows).round(3),
+    }, columns=COLUMNS)
+
+
+def superstore_csv(path, rows, seed=0, start="2015-01-01", end="2018-12-30"):
+    """
+    writes rows orders in chunks, dates are dd/mm/YYYY like train.csv
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, end, freq="D").strftime("%d/%m/%Y").to_numpy()
+    products, places = _pools()
+
+    written = 0
+    with open(path, "w", newline="") as f:
+        while written < rows:
+            size = min(CHUNK_ROWS, rows - written)
+            chunk = _chunk(rng, written, size, days, products, places)
+            chunk.to_csv(f, index=False, header=written == 0)
+            written += size
+    return path
+
+
+def dataset(size, seed=0):
+    """
+    path of the generated file for a named size, built on first use
+    """
+    path = os.path.join(BENCH_DIR, f"superstore_{size}.csv")
+    if not os.path.exists(path):
+        superstore_csv(path, SIZES[size], seed=seed)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=SIZES["10k"])
+    parser.add_argument("--out", default=os.path.join(BENCH_DIR, "superstore.csv"))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    superstore_csv(args.out, args.rows, seed=args.seed)
+    print(f"wrote {args.rows} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
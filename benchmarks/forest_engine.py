@@ -0,0 +1,79 @@
+"""
+compares predict time of the sklearn forest and the compiled engine
+
+    python -m benchmarks.forest_engine --batches 1 100 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.services import model_registry
+from backend.services.forest_engine import compile_forest
+
+
+def make_features(rows, feature_cols, seed=0):
+    rng = np.random.default_rng(seed)
+    lags = 80000 * rng.uniform(0.7, 1.3, (rows, 3))
+    month = rng.integers(1, 13, rows)
+    data = {
+        "month": month,
+        "quarter": (month - 1) // 3 + 1,
+        "year": rng.integers(2015, 2019, rows),
+        "lag_1": lags[:, 0],
+        "lag_2": lags[:, 1],
+        "lag_3": lags[:, 2],
+        "rolling_mean_3": lags.mean(axis=1),
+        "rolling_std_3": lags.std(axis=1, ddof=1),
+    }
+    return pd.DataFrame({col: data[col] for col in feature_cols})
+
+
+def bench(fn, X, runs):
+    #first call pays allocation and any lazy setup
+    fn(X)
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batches", nargs="+", type=int, default=[1, 100, 100_000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    model = model_registry.get_model()
+    feature_cols = model_registry.get_feature_cols()
+
+    start = time.perf_counter()
+    engine = compile_forest(model)
+    print(f"compiled {len(engine.trees)} trees in {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{engine.nbytes / 1e6:.2f} MB of node arrays")
+
+    paths = {
+        "sklearn": model.predict,
+        "engine": engine.predict,
+        "vector": lambda X: engine._predict_vector(engine._matrix(X)),
+        "trees": lambda X: engine._predict_trees(engine._matrix(X)),
+    }
+
+    print(f"{'rows':>8}{'path':>10}{'ms/call':>12}{'rows/s':>14}{'max diff':>12}")
+    for rows in args.batches:
+        X = make_features(rows, feature_cols)
+        expected = model.predict(X)
+        # keeps the big batches from taking minutes on slow paths
+        runs = max(1, min(args.runs, 200_000 // rows))
+        for name, fn in paths.items():
+            ms = bench(fn, X, runs)
+            diff = np.abs(fn(X) - expected).max()
+            print(f"{rows:>8}{name:>10}{ms:>12.3f}{rows / ms * 1000:>14.0f}{diff:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
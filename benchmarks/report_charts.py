@@ -0,0 +1,67 @@
+"""
+compares report render time and pdf size per chart backend
+
+    python -m benchmarks.report_charts --runs 5
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.services.pdfgen import generate_pdf_report
+
+
+def make_payload(periods, freq="MS", seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2015-01-01", periods=periods, freq=freq)
+    sales = 1000 + np.cumsum(rng.normal(0, 50, periods))
+    growth = np.r_[0.0, np.diff(sales) / sales[:-1] * 100]
+    fmt = "%Y-%m" if freq == "MS" else "%Y-%m-%d"
+
+    return {
+        "kpis": {
+            "avg_sales": float(sales.mean()),
+            "latest_sales": float(sales[-1]),
+        },
+        "insights": ["Sales are trending upward.", "Latest month beats the average."],
+        "trend": {
+            "dates": list(dates.strftime(fmt)),
+            "sales": sales.round(2).tolist(),
+            "growth": growth.round(2).tolist(),
+        },
+    }
+
+
+def bench(payload, backend, runs):
+    #first render pays imports and font loading
+    generate_pdf_report(payload, chart_backend=backend)
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pdf = generate_pdf_report(payload, chart_backend=backend)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000, len(pdf.getvalue())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=["vector", "matplotlib"])
+    args = parser.parse_args(argv)
+
+    payloads = {
+        "48 months": make_payload(48),
+        "1000 days": make_payload(1000, freq="D"),
+    }
+
+    print(f"{'payload':<12}{'backend':<12}{'ms/report':>12}{'pdf bytes':>12}")
+    for name, payload in payloads.items():
+        for backend in args.backends:
+            ms, size = bench(payload, backend, args.runs)
+            print(f"{name:<12}{backend:<12}{ms:>12.1f}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+end-to-end endpoint benchmarks on the Flask test client (no network)
+
+    python -m benchmarks.run --sizes 10k 1m --runs 10
+    python -m benchmarks.run --sizes 10k --save-baseline
+    python -m benchmarks.run --sizes 10k --baseline benchmarks/baseline.json
+
+each endpoint runs in its own process so peak RSS is per endpoint,
+the first request is reported as the cold stage and the rest as warm
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from . import datagen
+from .report_charts import make_payload
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+DEFAULT_THRESHOLD = 0.2
+
+MANUAL_ROW = {
+    "year": 2018, "month": 9, "quarter": 3,
+    "lag_1": 85000, "lag_2": 83000, "lag_3": 81000
+}
+
+# sized endpoints take the generated upload, the rest run once per suite
+SCENARIOS = {
+    "predict_manual": {"path": "/predict/manual", "json": MANUAL_ROW},
+    "predict_manual_batch": {"path": "/predict/manual/batch", "json": [MANUAL_ROW] * 1000},
+    "forecast_csv": {"path": "/forecast/csv", "upload": True},
+    "forecast_segmented": {
+        "path": "/forecast/segmented",
+        "upload": True,
+        "form": {"region": "West", "category": "Furniture", "sub_category": "Chairs"}
+    },
+    "forecast_segmented_all": {"path": "/forecast/segmented/all", "upload": True},
+    "forecast_sarima": {"path": "/forecast/sarima?steps=30"},
+    "download_report": {"path": "/download-report", "json": make_payload(48)},
+}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _clear_caches():
+    from backend.services.result_cache import upload_cache
+    from backend.services import sarima_forecast
+
+    upload_cache.clear()
+    sarima_forecast._responses.clear()
+    sarima_forecast._horizons.clear()
+
+
+def _request(client, scenario, data_path):
+    if scenario.get("upload"):
+        with open(data_path, "rb") as f:
+            return _post(client, scenario, {
+                "data": {"file": (f, os.path.basename(data_path)), **scenario.get("form", {})},
+                "content_type": "multipart/form-data"
+            })
+    return _post(client, scenario, {"json": scenario["json"]} if "json" in scenario else {})
+
+
+def _post(client, scenario, kwargs):
+    start = time.perf_counter()
+    response = client.post(scenario["path"], headers={"X-Timing": "1"}, **kwargs)
+    # streamed responses are only done once the body is consumed
+    response.get_data()
+    elapsed = time.perf_counter() - start
+    return elapsed, response.status_code, _stage_times(response.headers.get("X-Timing"))
+
+
+def _stage_times(header):
+    """
+    {stage: seconds} from an X-Timing header, repeated stages are summed
+    """
+    out = {}
+    for part in (header or "").split(","):
+        name, _, dur = part.strip().partition(";dur=")
+        if name and dur and name != "total":
+            out[name] = out.get(name, 0.0) + float(dur) / 1000
+    return out
+
+
+def _summary(times):
+    ms = np.asarray(times) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p90_ms": round(float(np.percentile(ms, 90)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def run_scenario(name, size, data_path, rows, runs, cached=False):
+    """
+    runs one endpoint in the current process, meant to be called in
+    a fresh worker so the RSS numbers belong to this endpoint only
+    """
+    from backend.app import app
+    from backend.services import model_registry
+
+    model_registry.preload()
+    client = app.test_client()
+    scenario = SCENARIOS[name]
+    rss_start = _peak_rss_mb()
+
+    times, breakdown, errors = [], {}, 0
+    for i in range(runs + 1):
+        if not cached:
+            _clear_caches()
+        elapsed, status, stage_times = _request(client, scenario, data_path)
+        errors += status >= 400
+        times.append(elapsed)
+        if i > 0:
+            for name, seconds in stage_times.items():
+                breakdown.setdefault(name, []).append(seconds)
+
+    warm = times[1:]
+    result = {
+        "endpoint": scenario["path"],
+        "size": size,
+        "rows": rows,
+        "runs": runs,
+        "cached": cached,
+        "errors": int(errors),
+        "stages": {
+            "cold": {"ms": round(times[0] * 1000, 2)},
+            "warm": _summary(warm),
+            # service stages reported by the app, warm runs only
+            **{name: _summary(values) for name, values in breakdown.items()},
+        },
+        "throughput_rps": round(len(warm) / sum(warm), 3),
+        "rss_start_mb": rss_start,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if rows:
+        result["rows_per_s"] = round(rows / float(np.median(warm)), 1)
+    return result
+
+
+def run_suite(sizes, endpoints, runs, cached=False):
+    ctx = multiprocessing.get_context("spawn")
+    jobs = []
+    for name in endpoints:
+        if SCENARIOS[name].get("upload"):
+            for size in sizes:
+                jobs.append((name, size, datagen.dataset(size), datagen.SIZES[size]))
+        else:
+            jobs.append((name, "fixed", None, None))
+
+    results = {}
+    for name, size, path, rows in jobs:
+        key = f"{name}/{size}"
+        print(f"running {key} ...", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results[key] = pool.submit(run_scenario, name, size, path, rows, runs, cached).result()
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    warm p50 and peak RSS against the baseline, returns the keys that
+    got slower or bigger by more than threshold
+    """
+    regressions = []
+    print(f"{'scenario':<36}{'p50 ms':>10}{'base':>10}{'ratio':>8}{'rss MB':>10}{'base':>10}")
+    for key, result in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        p50 = result["stages"]["warm"]["p50_ms"]
+        base_p50 = base["stages"]["warm"]["p50_ms"]
+        ratio = p50 / base_p50 if base_p50 else float("inf")
+        rss, base_rss = result.get("peak_rss_mb"), base.get("peak_rss_mb")
+
+        slower = ratio > 1 + threshold
+        bigger = bool(rss and base_rss and rss > base_rss * (1 + threshold))
+        flag = "  REGRESSION" if slower or bigger else ""
+        print(f"{key:<36}{p50:>10.1f}{base_p50:>10.1f}{ratio:>8.2f}{rss or 0:>10.1f}{base_rss or 0:>10.1f}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["10k"], choices=list(datagen.SIZES))
+    parser.add_argument("--endpoints", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--cached", action="store_true",
+                        help="keep result caches between runs and measure cache hits")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "runs": args.runs,
+            "cached": args.cached,
+        },
+        "results": run_suite(args.sizes, args.endpoints, args.runs, args.cached),
+    }
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {out}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {BASELINE_PATH}")
+
+    baseline_path = args.baseline or (BASELINE_PATH if not args.save_baseline else None)
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            regressions = compare(report["results"], json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import pytest
+
+from backend.app import app
+from backend.services import manuel_forecast, model_registry, segmented_forecast
+from backend.services.model_bank import ModelBank
+
+FEATURE_COLS = ["month", "quarter", "year", "lag_1", "lag_2", "lag_3", "rolling_mean_3", "rolling_std_3"]
+
+
+class LastValue:
+    """
+    stand-in forest: predicts the previous value plus the month
+    """
+
+    def predict(self, X):
+        return (X["lag_1"] + X["month"]).to_numpy()
+
+
+@pytest.fixture
+def client():
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+@pytest.fixture
+def forest(monkeypatch, tmp_path):
+    """
+    serves LastValue as a left-closed global model and an empty segment bank
+    """
+    model = LastValue()
+    monkeypatch.setattr(model_registry, "get_predictor", lambda: model)
+    monkeypatch.setattr(model_registry, "rolling_closed", lambda: "left")
+    monkeypatch.setattr(model_registry, "get_feature_cols", lambda: FEATURE_COLS)
+    monkeypatch.setattr(model_registry, "model_version", lambda name="sales_forecast": f"{name}:test")
+    bank = ModelBank(tmp_path / "manifest.json")
+    monkeypatch.setattr(manuel_forecast, "bank", bank)
+    monkeypatch.setattr(segmented_forecast, "bank", bank)
+    return model
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services import backtest
+from backend.services.featureeng import feature_matrix
+
+
+def test_rolling_origins_end_at_the_last_observation():
+    assert backtest.rolling_origins(100, 3, 10) == [70, 80, 90]
+    # folds without MIN_TRAIN rows of history are dropped
+    assert backtest.rolling_origins(30, 3, 10, min_train=12) == [20]
+
+
+def test_scores():
+    out = backtest.scores([10, 0, 20], [12, 1, 20])
+    assert out["mae"] == pytest.approx(1.0)
+    assert out["rmse"] == pytest.approx(np.sqrt(5 / 3))
+    # the zero actual has no percentage error
+    assert out["mape"] == pytest.approx(10.0)
+    assert backtest.scores([0, 0], [1, 1])["mape"] is None
+
+
+def test_training_rows_before_an_origin_do_not_see_it():
+    dates = pd.date_range("2020-01-01", periods=60, freq="D")
+    values = np.random.default_rng(0).uniform(0, 100, 60)
+    changed = values.copy()
+    changed[40:] *= 10
+    X, valid = feature_matrix(dates, values, backtest.DEFAULT_FEATURE_COLS)
+    X2, _ = feature_matrix(dates, changed, backtest.DEFAULT_FEATURE_COLS)
+    np.testing.assert_array_equal(X[:40][valid[:40]], X2[:40][valid[:40]])
+
+
+def test_segment_slices():
+    dates = pd.to_datetime(
+        ["2020-01-0%d" % d for d in range(1, 9)] + ["2020-01-06", "2020-01-07"]
+    ).to_numpy()
+    s = {"bounds": np.array([0, 8, 10]), "dates": dates}
+    origin = np.datetime64("2020-01-06")
+    slices = backtest._segment_slices(s, origin, origin + np.timedelta64(2, "D"))
+    # the second segment has no history before the origin
+    assert slices == [(0, 0, 5, 7)]
+
+
+@pytest.fixture
+def series_files(tmp_path):
+    rng = np.random.default_rng(0)
+    months = pd.date_range("2015-01-01", periods=36, freq="MS")
+    pd.DataFrame({
+        "Order Date": months.strftime("%m/%d/%Y"),
+        "Sales": rng.uniform(1000, 5000, len(months))
+    }).to_csv(tmp_path / "monthly.csv", index=False)
+
+    days = pd.date_range("2017-01-01", periods=200, freq="D")
+    rows = []
+    for region in ("East", "West"):
+        for day in days:
+            rows.append({
+                "order_date": day.strftime("%m/%d/%Y"),
+                "sales": rng.uniform(10, 500),
+                "region": region,
+                "category": "Furniture",
+                "sub_category": "Chairs"
+            })
+    pd.DataFrame(rows).to_csv(tmp_path / "clean.csv", index=False)
+    return tmp_path / "monthly.csv", tmp_path / "clean.csv"
+
+
+def test_run_scores_every_fold(series_files, monkeypatch):
+    monthly, daily = series_files
+    monkeypatch.setattr(backtest, "rf_params", lambda trees=None: {"n_estimators": 5, "random_state": 0, "n_jobs": 1})
+    report = backtest.run(
+        names=("monthly", "daily", "segments"),
+        models=("rf", "naive"),
+        segment_models=("rf", "naive"),
+        jobs=1,
+        folds=2,
+        monthly_path=str(monthly),
+        daily_path=str(daily)
+    )
+
+    assert {(r["series"], r["model"]) for r in report["summary"]} == {
+        (name, model) for name in ("monthly", "daily", "segments") for model in ("rf", "naive")
+    }
+    assert all(r["failed"] == 0 and r["folds"] == 2 for r in report["summary"])
+    origins = [f["origin"] for f in report["folds"] if f["series"] == "daily" and f["model"] == "naive"]
+    assert origins == ["2017-05-21", "2017-06-20"]
+    assert {row["region"] for row in report["segments"]["naive"]} == {"East", "West"}
@@ -0,0 +1,82 @@
+import hashlib
+
+import pytest
+
+from backend.services import datasets
+from benchmarks.datagen import superstore_csv
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = datasets.DatasetStore(directory=str(tmp_path / "sessions"))
+    monkeypatch.setattr(datasets, "store", store)
+    return store
+
+
+@pytest.fixture
+def upload(tmp_path):
+    def make(seed=0):
+        path = tmp_path / f"orders_{seed}.csv"
+        superstore_csv(str(path), 2000, seed=seed)
+        return path
+    return make
+
+
+def _post(client, path):
+    with open(path, "rb") as f:
+        return client.post("/datasets", data={"file": (f, path.name)}, content_type="multipart/form-data")
+
+
+def test_upload_is_parsed_once(client, store, upload):
+    path = upload()
+    first = _post(client, path)
+    assert first.status_code == 201
+    body = first.get_json()
+    assert body["dataset_id"] == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert body["views"] == ["forecast", "segments"]
+    assert body["segments"] > 0 and body["start_date"] < body["end_date"]
+
+    again = _post(client, path)
+    assert again.status_code == 200
+    assert again.get_json()["dataset_id"] == body["dataset_id"]
+
+
+def test_info_trend_and_delete(client, store, upload):
+    dataset_id = _post(client, upload()).get_json()["dataset_id"]
+
+    assert client.get(f"/datasets/{dataset_id}").get_json()["dataset_id"] == dataset_id
+    trend = client.get(f"/datasets/{dataset_id}/trend").get_json()
+    assert trend["trend"] and "kpis" in trend
+
+    assert client.delete(f"/datasets/{dataset_id}").get_json()["deleted"] is True
+    assert client.get(f"/datasets/{dataset_id}").status_code == 404
+    assert client.delete(f"/datasets/{dataset_id}").status_code == 404
+
+
+def test_unknown_ids(client, store):
+    assert client.get("/datasets/" + "0" * 64).status_code == 404
+    assert client.get("/datasets/../etc").status_code == 404
+    assert client.post("/datasets").status_code == 400
+
+
+def test_evicted_datasets_are_read_back(client, store, upload):
+    store.max_bytes = 1
+    first = _post(client, upload(0)).get_json()["dataset_id"]
+    _post(client, upload(1))
+    assert client.get("/datasets").get_json()["in_memory"] == 1
+
+    assert client.get(f"/datasets/{first}").status_code == 200
+    stats = client.get("/datasets").get_json()
+    assert stats["spills"] == 2 and stats["disk_loads"] == 1
+
+
+def test_dataset_id_matches_a_direct_upload(client, store, forest, upload):
+    path = upload()
+    dataset_id = _post(client, path).get_json()["dataset_id"]
+    with open(path, "rb") as f:
+        direct = client.post("/forecast/csv", data={"file": (f, path.name)}, content_type="multipart/form-data")
+    by_id = client.post("/forecast/csv", data={"dataset_id": dataset_id})
+
+    assert direct.status_code == by_id.status_code == 200
+    assert by_id.get_json() == direct.get_json()
+    assert client.post("/forecast/csv", data={"dataset_id": "f" * 64}).status_code == 404
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from backend.services.date_parsing import DateParser, infer_format, parse_dates
+
+
+def test_infers_day_first():
+    values = ["13/01/2020", "25/02/2020", "03/04/2020"]
+    assert infer_format(values) == "%d/%m/%Y"
+
+
+def test_ambiguous_dates_follow_dayfirst():
+    values = ["01/02/2020", "03/04/2020"]
+    assert infer_format(values, dayfirst=True) == "%d/%m/%Y"
+    assert infer_format(values, dayfirst=False) == "%m/%d/%Y"
+
+
+def test_bad_rows_are_reported():
+    good = pd.date_range("2020-01-01", periods=20, freq="D").strftime("%Y-%m-%d").tolist()
+    parsed, report = parse_dates(pd.Series(good[:2] + ["soon", None] + good[2:]))
+    assert parsed.isna().sum() == 2 and parsed.iloc[2:4].isna().all()
+    assert report["format"] == "%Y-%m-%d"
+    assert report["rows"] == 22 and report["bad_rows"] == 2
+    assert [e["row"] for e in report["examples"]] == [2, 3]
+
+
+def test_no_dominant_format_falls_back_to_mixed():
+    parsed, report = parse_dates(pd.Series(["2020-01-05", "soon", "07/03/2020"]), dayfirst=True)
+    assert report["format"] is None
+    assert parsed.tolist()[::2] == [pd.Timestamp("2020-01-05"), pd.Timestamp("2020-03-07")]
+
+
+def test_chunks_share_format_and_row_numbers():
+    parser = DateParser(dayfirst=False)
+    first = parser.parse(pd.Series(["12/31/2019", "01/02/2020"]))
+    second = parser.parse(pd.Series(["01/02/2020", "bad"], index=[2, 3]))
+
+    assert first.tolist() == [pd.Timestamp("2019-12-31"), pd.Timestamp("2020-01-02")]
+    assert second.iloc[0] == pd.Timestamp("2020-01-02")
+    assert second.index.tolist() == [2, 3]
+    assert parser.report()["examples"] == [{"row": 3, "value": "bad"}]
+
+
+def test_matches_pandas_on_a_full_column():
+    dates = pd.date_range("2018-01-01", periods=400, freq="D")
+    parsed, _ = parse_dates(pd.Series(dates.strftime("%d-%m-%Y")))
+    assert (parsed.to_numpy() == dates.to_numpy()).all()
@@ -0,0 +1,66 @@
+import pytest
+from flask import Response, request
+
+from backend.app import app
+from backend.services import executors
+
+
+@pytest.fixture
+def slots(monkeypatch):
+    """
+    a fresh one-slot limit per endpoint name used here
+    """
+    monkeypatch.setattr(executors, "QUEUE_TIMEOUT", 0)
+    for name in ("test", "csv", "manual"):
+        monkeypatch.setitem(executors._slots, name, executors._Slots(name, 1))
+    return executors._slots
+
+
+def _stream():
+    return Response(iter(["a", "b"]))
+
+
+def test_full_endpoint_answers_429(client, slots):
+    slots["csv"].acquire(0)
+    response = client.post("/forecast/csv")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
+    assert client.get("/executors").get_json()["endpoints"]["csv"]["rejected"] == 1
+
+
+def test_slot_is_released_after_a_call(slots):
+    assert executors.run("test", lambda x: x * 2, 21) == 42
+    with pytest.raises(ZeroDivisionError):
+        executors.run("test", lambda: 1 / 0)
+    assert slots["test"].running == 0
+
+
+def test_request_context_reaches_the_pool(slots):
+    with app.test_request_context("/forecast/csv?steps=3"):
+        assert executors.run("test", lambda: request.args["steps"]) == "3"
+
+
+def test_streamed_body_holds_the_slot_until_read(slots):
+    response = executors.run("test", _stream)
+    assert slots["test"].running == 1
+    with pytest.raises(executors.Busy):
+        executors.run("test", _stream)
+    assert b"".join(response.iter_encoded()) == b"ab"
+    assert slots["test"].running == 0
+
+
+def test_closing_a_streamed_body_releases_the_slot(slots):
+    response = executors.run("test", _stream)
+    next(iter(response.response))
+    response.close()
+    response.close()
+    assert slots["test"].running == 0
+
+
+def test_streamed_endpoint_releases_once_consumed(client, forest, slots):
+    rows = [{"year": 2018, "month": 9, "quarter": 3, "lag_1": 1, "lag_2": 2, "lag_3": 3}] * 3
+    response = client.post("/predict/manual/batch", json=rows, buffered=False)
+    assert slots["manual"].running == 1
+    assert len(response.get_json()) == 3
+    response.close()
+    assert slots["manual"].running == 0
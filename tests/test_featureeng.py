@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services.featureeng import (
+    lag_features,
+    grouped_lag_features,
+    next_features,
+    feature_matrix,
+    period_features,
+    valid_rows,
+    warmup
+)
+
+FEATURE_COLS = ["month", "quarter", "year", "lag_1", "lag_2", "lag_3", "rolling_mean_3", "rolling_std_3"]
+
+
+def _expected(s, closed="right"):
+    return {
+        "lag_1": s.shift(1),
+        "lag_2": s.shift(2),
+        "lag_3": s.shift(3),
+        "rolling_mean_3": s.rolling(3, closed=closed).mean(),
+        "rolling_std_3": s.rolling(3, closed=closed).std()
+    }
+
+
+@pytest.mark.parametrize("closed", ["right", "left"])
+def test_lag_features_match_pandas(closed):
+    s = pd.Series(np.random.default_rng(0).uniform(0, 1000, 200))
+    out = lag_features(s.to_numpy(), closed=closed)
+    for name, col in _expected(s, closed).items():
+        np.testing.assert_allclose(out[name], col.to_numpy(), rtol=1e-9, atol=1e-6, equal_nan=True)
+
+
+@pytest.mark.parametrize("closed", ["right", "left"])
+def test_lag_features_do_not_cross_series(closed):
+    rng = np.random.default_rng(1)
+    parts = [pd.Series(rng.uniform(0, 100, n)) for n in (7, 2, 30)]
+    starts = np.cumsum([0] + [len(p) for p in parts[:-1]])
+    out = lag_features(pd.concat(parts).to_numpy(), starts=starts, closed=closed)
+
+    expected = {name: [] for name in out}
+    for part in parts:
+        for name, col in _expected(part, closed).items():
+            expected[name].append(col.to_numpy())
+    for name, cols in expected.items():
+        np.testing.assert_allclose(out[name], np.concatenate(cols), rtol=1e-9, atol=1e-6, equal_nan=True)
+
+
+def test_valid_rows_follow_warmup():
+    starts = np.array([0, 5])
+    for closed in ("right", "left"):
+        valid = valid_rows(12, starts, closed=closed)
+        w = warmup(closed=closed)
+        assert valid.tolist() == [i >= w for i in range(5)] + [i >= w for i in range(7)]
+        # the rows valid_rows keeps are exactly the ones with every feature
+        out = lag_features(np.arange(12.0), starts=starts, closed=closed)
+        complete = np.all([~np.isnan(col) for col in out.values()], axis=0)
+        assert (complete == valid).all()
+
+
+def test_grouped_lag_features_match_pandas_groupby():
+    rng = np.random.default_rng(2)
+    n = 500
+    df = pd.DataFrame({
+        "region": rng.choice(["East", "West"], n),
+        "category": rng.choice(["A", "B", "C"], n),
+        "order_date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 60, n), unit="D"),
+        "sales": rng.uniform(1, 500, n)
+    })
+    agg, starts = grouped_lag_features(df, ["region", "category"])
+
+    daily = df.groupby(["region", "category", "order_date"])["sales"].sum().reset_index()
+    g = daily.groupby(["region", "category"])["sales"]
+    assert len(starts) == g.ngroups
+    np.testing.assert_allclose(agg["sales"], daily["sales"])
+    np.testing.assert_allclose(agg["lag_2"], g.shift(2), equal_nan=True)
+    np.testing.assert_allclose(
+        agg["rolling_std_3"],
+        g.rolling(3).std().reset_index(level=[0, 1], drop=True),
+        rtol=1e-9, atol=1e-6, equal_nan=True
+    )
+    assert (agg["month"] == agg["order_date"].dt.month).all()
+
+
+def test_next_features_match_left_closed_training_rows():
+    # a model trained on closed="left" rows sees the same input when
+    # recursive_forecast builds the next period from the last values
+    rng = np.random.default_rng(3)
+    dates = pd.date_range("2021-01-01", periods=40, freq="D")
+    values = rng.uniform(0, 300, 40)
+    X, valid = feature_matrix(dates, values, FEATURE_COLS, closed="left")
+
+    for t in np.flatnonzero(valid):
+        served = next_features(values[t - 3:t], period_features(dates[t:t + 1]), FEATURE_COLS)
+        np.testing.assert_allclose(served[0], X[t], rtol=1e-9, atol=1e-6)
+
+
+def test_right_closed_training_rows_differ_from_served_input():
+    values = np.array([10.0, 20.0, 30.0, 400.0])
+    dates = pd.date_range("2021-01-01", periods=4, freq="D")
+    X, _ = feature_matrix(dates, values, FEATURE_COLS)
+    served = next_features(values[:3], period_features(dates[3:]), FEATURE_COLS)
+    mean = FEATURE_COLS.index("rolling_mean_3")
+    assert X[3, mean] == pytest.approx(150.0)
+    assert served[0, mean] == pytest.approx(20.0)
+
+
+def test_lag_features_rejects_unknown_closed():
+    with pytest.raises(ValueError):
+        lag_features(np.arange(5.0), closed="both")
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from backend.services.forest_engine import CompiledForest, compile_forest, VECTOR_MAX_ROWS
+
+COLS = ["month", "lag_1", "lag_2", "rolling_mean_3"]
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 100, (400, len(COLS))), columns=COLS)
+    y = X["lag_1"] * 2 + rng.normal(0, 5, 400)
+    return RandomForestRegressor(n_estimators=20, max_depth=7, random_state=0).fit(X, y)
+
+
+@pytest.mark.parametrize("rows", [1, VECTOR_MAX_ROWS, VECTOR_MAX_ROWS + 1, 1000])
+def test_predict_matches_sklearn(forest, rows):
+    X = pd.DataFrame(np.random.default_rng(rows).uniform(-10, 110, (rows, len(COLS))), columns=COLS)
+    engine = compile_forest(forest)
+    np.testing.assert_allclose(engine.predict(X), forest.predict(X), rtol=1e-10)
+
+
+def test_both_paths_match_sklearn(forest):
+    X = pd.DataFrame(np.random.default_rng(5).uniform(0, 100, (300, len(COLS))), columns=COLS)
+    engine = compile_forest(forest)
+    matrix = engine._matrix(X)
+    expected = forest.predict(X)
+    np.testing.assert_allclose(engine._predict_vector(matrix), expected, rtol=1e-10)
+    np.testing.assert_allclose(engine._predict_trees(matrix), expected, rtol=1e-10)
+
+
+def test_columns_are_reordered_by_name(forest):
+    X = pd.DataFrame(np.random.default_rng(6).uniform(0, 100, (5, len(COLS))), columns=COLS)
+    engine = compile_forest(forest)
+    np.testing.assert_allclose(engine.predict(X[COLS[::-1]]), forest.predict(X), rtol=1e-10)
+
+
+@pytest.mark.filterwarnings("error")
+def test_missing_values_go_through_sklearn(forest):
+    X = pd.DataFrame([[1.0, np.nan, 3.0, 4.0]], columns=COLS)
+    engine = compile_forest(forest)
+    np.testing.assert_allclose(engine.predict(X), forest.predict(X))
+    # sklearn still checks the frame it is given
+    np.testing.assert_allclose(engine.predict(X[COLS[::-1]]), forest.predict(X))
+
+
+def test_wrong_width_is_rejected(forest):
+    with pytest.raises(ValueError):
+        compile_forest(forest).predict(np.zeros((2, 3)))
+
+
+def test_unsupported_models_are_not_compiled():
+    model = LinearRegression().fit(np.arange(10.0)[:, None], np.arange(10.0))
+    assert not CompiledForest.supports(model)
+    assert compile_forest(model) is None
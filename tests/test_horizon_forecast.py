@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services import model_registry
+from backend.services.featureeng import next_features, period_features
+from backend.services.horizon_forecast import horizon_error, recursive_forecast
+from benchmarks.datagen import superstore_csv
+
+FEATURE_COLS = ["month", "quarter", "year", "lag_1", "lag_2", "lag_3", "rolling_mean_3", "rolling_std_3"]
+
+
+class MeanOfLags:
+    """
+    stand-in model: next value is the rolling mean plus the month
+    """
+
+    def predict(self, X):
+        return (X["rolling_mean_3"] + X["month"]).to_numpy()
+
+
+def _one_by_one(history, last_date, steps, freq):
+    window = list(history[-3:])
+    date = pd.Timestamp(last_date)
+    out = []
+    for _ in range(steps):
+        date = date + pd.tseries.frequencies.to_offset(freq)
+        X = pd.DataFrame(
+            next_features(np.array(window[-3:]), period_features([date]), FEATURE_COLS),
+            columns=FEATURE_COLS
+        )
+        value = MeanOfLags().predict(X)[0]
+        out.append(value)
+        window.append(value)
+    return out
+
+
+@pytest.mark.parametrize("freq", ["D", "MS"])
+def test_lockstep_matches_one_series_at_a_time(freq):
+    rng = np.random.default_rng(0)
+    history = rng.uniform(0, 100, (4, 6))
+    last = pd.to_datetime(["2020-01-31", "2020-02-29", "2020-12-31", "2021-06-15"])
+    if freq == "MS":
+        last = last.to_period("M").to_timestamp()
+
+    predictions, dates = recursive_forecast(MeanOfLags(), FEATURE_COLS, history, last, 5, freq)
+
+    assert predictions.shape == (4, 5)
+    assert len(dates) == 5
+    for i in range(4):
+        np.testing.assert_allclose(predictions[i], _one_by_one(history[i], last[i], 5, freq))
+
+
+def test_month_rolls_over_the_year():
+    _, dates = recursive_forecast(MeanOfLags(), FEATURE_COLS, np.ones((1, 3)), ["2020-12-31"], 2)
+    assert [d[0] for d in dates] == [pd.Timestamp("2021-01-01"), pd.Timestamp("2021-01-02")]
+
+
+def test_needs_three_observations():
+    with pytest.raises(ValueError):
+        recursive_forecast(MeanOfLags(), FEATURE_COLS, np.ones((1, 2)), ["2020-01-01"], 3)
+
+
+def test_right_closed_models_get_one_step():
+    assert horizon_error("left", 30) is None
+    assert horizon_error("right", 1) is None
+    assert "train_forest" in horizon_error("right", 2)
+
+
+@pytest.fixture
+def orders(tmp_path):
+    path = tmp_path / "orders.csv"
+    superstore_csv(str(path), 3000)
+    return path
+
+
+def _post(client, path, url, **form):
+    with open(path, "rb") as f:
+        return client.post(url, data={"file": (f, path.name), **form}, content_type="multipart/form-data")
+
+
+def test_csv_horizon(client, forest, orders):
+    body = _post(client, orders, "/forecast/csv", horizon="4").get_json()
+    assert len(body["forecast_horizon"]["sales"]) == 4
+
+
+@pytest.mark.parametrize("url", ["/forecast/csv", "/forecast/segmented"])
+def test_right_closed_global_model_refuses_horizons(client, forest, orders, monkeypatch, url):
+    monkeypatch.setattr(model_registry, "rolling_closed", lambda: "right")
+    refused = _post(client, orders, url, horizon="3")
+    assert refused.status_code == 400 and "right-closed" in refused.get_json()["error"]
+    assert _post(client, orders, url, horizon="1").status_code == 200
+
+
+def test_right_closed_global_model_in_segmented_all(client, forest, orders, monkeypatch):
+    monkeypatch.setattr(model_registry, "rolling_closed", lambda: "right")
+    segments = _post(client, orders, "/forecast/segmented/all", horizon="3").get_json()["segments"]
+    assert segments and all("right-closed" in s["error"] for s in segments)
@@ -0,0 +1,61 @@
+import json
+
+from backend.services import executors
+
+ROW = {"year": 2018, "month": 9, "quarter": 3, "lag_1": 85000, "lag_2": 83000, "lag_3": 81000}
+
+
+def _rows(n):
+    return [{**ROW, "lag_1": 1000 * (i + 1)} for i in range(n)]
+
+
+def test_json_array_keeps_input_order(client, forest):
+    response = client.post("/predict/manual/batch", json=_rows(3))
+    assert response.status_code == 200
+    results = response.get_json()
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert [r["predicted_sales"] for r in results] == [1009.0, 2009.0, 3009.0]
+    assert {r["model_source"] for r in results} == {"global"}
+
+
+def test_batch_matches_single_prediction(client, forest):
+    single = client.post("/predict/manual", json=ROW).get_json()
+    batch = client.post("/predict/manual/batch", json={"rows": [ROW]}).get_json()[0]
+    for key in ("predicted_sales", "rolling_mean", "rolling_std"):
+        assert batch[key] == single[key]
+
+
+def test_bad_rows_are_reported_in_place(client, forest):
+    rows = _rows(3)
+    rows[1]["lag_1"] = "x"
+    results = client.post("/predict/manual/batch", json=rows).get_json()
+    assert "error" in results[1] and results[1]["index"] == 1
+    assert results[2]["predicted_sales"] == 3009.0
+
+
+def test_rejects_non_list_body(client, forest):
+    response = client.post("/predict/manual/batch", json={"year": 2018})
+    assert response.status_code == 400
+
+
+def test_ndjson_in_and_out(client, forest):
+    lines = [json.dumps(row) for row in _rows(2)]
+    body = "\n".join([lines[0], "{not json", "", lines[1]]) + "\n"
+    response = client.post("/predict/manual/batch", data=body, content_type="application/x-ndjson")
+
+    assert response.mimetype == "application/x-ndjson"
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # the blank line is skipped, the malformed one keeps its position
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert "invalid JSON" in results[1]["error"]
+    assert [results[0]["predicted_sales"], results[2]["predicted_sales"]] == [1009.0, 2009.0]
+
+
+def test_ndjson_out_on_accept(client, forest):
+    response = client.post("/predict/manual/batch", json=_rows(2), headers={"Accept": "application/x-ndjson"})
+    assert len(response.get_data(as_text=True).splitlines()) == 2
+
+
+def test_runs_under_the_manual_slot(client, forest):
+    client.post("/predict/manual/batch", json=_rows(2)).get_data()
+    assert executors.stats()["endpoints"]["manual"]["running"] == 0
@@ -0,0 +1,102 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from backend.services import model_bank
+from backend.services.csv_loader import SEGMENT_COLS
+from backend.services.featureeng import grouped_lag_features, next_features, period_features, valid_rows
+
+FEATURE_COLS = ["month", "quarter", "year", "lag_1", "lag_2", "lag_3", "rolling_mean_3", "rolling_std_3"]
+KEYS = [("West", "Furniture", "Chairs"), ("East", "Technology", "Phones")]
+
+
+@pytest.fixture
+def orders():
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2018-01-01", periods=120, freq="D")
+    frames = []
+    for scale, key in zip((500, 5000), KEYS):
+        frames.append(pd.DataFrame({
+            "order_date": days,
+            "sales": scale * rng.uniform(0.5, 1.5, len(days)),
+            **dict(zip(SEGMENT_COLS, key))
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_training_rows_match_what_the_bank_is_served(orders):
+    # train() and recursive_forecast must build the same input for a
+    # given day, otherwise the bank scores far from its fit
+    closed = model_bank.ROLLING_CLOSED
+    agg, starts = grouped_lag_features(orders, SEGMENT_COLS, closed=closed)
+    valid = valid_rows(len(agg), starts, closed=closed)
+    X = agg[FEATURE_COLS].to_numpy()
+    bounds = np.append(starts, len(agg))
+
+    for g in range(len(starts)):
+        sales = agg["sales"].to_numpy()[bounds[g]:bounds[g + 1]]
+        dates = agg["order_date"].iloc[bounds[g]:bounds[g + 1]]
+        for t in np.flatnonzero(valid[bounds[g]:bounds[g + 1]]):
+            served = next_features(sales[t - 3:t], period_features(dates.iloc[t:t + 1]), FEATURE_COLS)
+            np.testing.assert_allclose(served[0], X[bounds[g] + t], rtol=1e-9, atol=1e-6)
+
+
+def _write_bank(directory, orders, rolling_closed=model_bank.ROLLING_CLOSED):
+    agg, starts = grouped_lag_features(orders, SEGMENT_COLS, closed=model_bank.ROLLING_CLOSED)
+    valid = valid_rows(len(agg), starts, closed=model_bank.ROLLING_CLOSED)
+    bounds = np.append(starts, len(agg))
+    segments = []
+    for g in range(len(starts)):
+        rows = np.arange(bounds[g], bounds[g + 1])[valid[bounds[g]:bounds[g + 1]]]
+        key = tuple(agg[SEGMENT_COLS].iloc[bounds[g]])
+        model = RandomForestRegressor(n_estimators=5, max_depth=4, random_state=0)
+        model.fit(agg[FEATURE_COLS].iloc[rows], agg["sales"].iloc[rows])
+        name = model_bank.segment_file(key)
+        joblib.dump(model, directory / name)
+        segments.append({
+            **dict(zip(SEGMENT_COLS, key)),
+            "status": "trained",
+            "file": name,
+            "file_bytes": (directory / name).stat().st_size,
+            "resident_bytes": 1000
+        })
+    manifest = {"feature_cols": FEATURE_COLS, "segments": segments}
+    if rolling_closed is not None:
+        manifest["rolling_closed"] = rolling_closed
+    (directory / "manifest.json").write_text(json.dumps(manifest))
+    return directory / "manifest.json"
+
+
+def test_segment_models_load_lazily_and_evict(tmp_path, orders):
+    bank = model_bank.ModelBank(_write_bank(tmp_path, orders), max_bytes=1)
+
+    assert bank.get(KEYS[0]) is not None
+    assert bank.get(KEYS[0]) is not None
+    assert bank.get(KEYS[1]) is not None
+    stats = bank.stats()
+    assert stats["trained_segments"] == 2
+    assert (stats["loads"], stats["hits"], stats["evictions"]) == (2, 1, 1)
+    assert stats["in_memory"] == 1
+
+
+def test_partial_or_unknown_segments_use_the_global_model(tmp_path, orders):
+    bank = model_bank.ModelBank(_write_bank(tmp_path, orders))
+    assert bank.get(("West", "Furniture", None)) is None
+    assert bank.get(("South", "Furniture", "Chairs")) is None
+    assert bank.stats()["fallbacks"] == 1
+
+
+def test_banks_trained_on_other_features_are_ignored(tmp_path, orders):
+    bank = model_bank.ModelBank(_write_bank(tmp_path, orders, rolling_closed=None))
+    assert bank.get(KEYS[0]) is None
+    assert bank.stats()["trained_segments"] == 0
+
+
+def test_missing_manifest(tmp_path):
+    bank = model_bank.ModelBank(tmp_path / "manifest.json")
+    assert bank.get(KEYS[0]) is None
+    assert bank.version() == "segments:none"
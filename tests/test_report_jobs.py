@@ -0,0 +1,97 @@
+import io
+import threading
+import time
+
+import pytest
+
+from backend.services import executors, report_jobs
+from backend.services.result_cache import ResultCache
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """
+    stands in for generate_pdf_report, renders block until release is set
+    """
+    state = {"calls": 0, "release": threading.Event()}
+
+    def render(data, progress=None):
+        state["calls"] += 1
+        if data.get("fail"):
+            raise ValueError("no forecast in payload")
+        state["release"].wait(5)
+        progress(5, 5)
+        return io.BytesIO(b"%PDF-" + str(data["n"]).encode())
+
+    monkeypatch.setattr(report_jobs, "generate_pdf_report", render)
+    monkeypatch.setattr(report_jobs, "_jobs", {})
+    monkeypatch.setattr(report_jobs, "_by_payload", {})
+    monkeypatch.setattr(report_jobs, "_finished", ResultCache(max_entries=2, ttl=60, max_bytes=10_000))
+    yield state
+    state["release"].set()
+
+
+def _wait(client, url):
+    for _ in range(200):
+        response = client.get(url)
+        if response.status_code != 202:
+            return response
+        time.sleep(0.01)
+    raise AssertionError(f"{url} still pending")
+
+
+def test_identical_payloads_share_a_job(client, renders):
+    first = client.post("/reports", json={"n": 1})
+    second = client.post("/reports", json={"n": 1})
+    assert first.status_code == second.status_code == 202
+    assert first.get_json()["id"] == second.get_json()["id"]
+
+    renders["release"].set()
+    done = _wait(client, first.get_json()["status_url"])
+    assert done.status_code == 200 and done.data == b"%PDF-1"
+    # the finished job still answers the same payload
+    assert client.post("/reports", json={"n": 1}).get_json()["status"] == "done"
+    assert renders["calls"] == 1
+
+
+def test_full_queue_is_refused(client, renders, monkeypatch):
+    monkeypatch.setattr(report_jobs, "MAX_PENDING_REPORTS", 2)
+    assert client.post("/reports", json={"n": 1}).status_code == 202
+    assert client.post("/reports", json={"n": 2}).status_code == 202
+    refused = client.post("/reports", json={"n": 3})
+    assert refused.status_code == 429 and refused.headers["Retry-After"] == "5"
+
+
+def test_renders_share_the_report_limit(client, renders, monkeypatch):
+    monkeypatch.setitem(executors._slots, "report", executors._Slots("report", 1))
+    for n in range(3):
+        client.post("/reports", json={"n": n})
+    time.sleep(0.1)
+    slots = executors._slots["report"].stats()
+    assert (slots["running"], slots["waiting"]) == (1, 2)
+    renders["release"].set()
+
+
+def test_failed_job_reports_its_error(client, renders):
+    job = client.post("/reports", json={"fail": True}).get_json()
+    response = _wait(client, job["status_url"])
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "failed"
+    assert "no forecast" in response.get_json()["error"]
+    # a failed payload is rendered again on resubmit
+    assert client.post("/reports", json={"fail": True}).get_json()["id"] != job["id"]
+
+
+def test_finished_jobs_are_bounded(client, renders):
+    renders["release"].set()
+    urls = [client.post("/reports", json={"n": n}).get_json()["status_url"] for n in range(3)]
+    for url in urls:
+        _wait(client, url)
+    # the job that finished first is evicted
+    assert sorted(client.get(url).status_code for url in urls) == [200, 200, 404]
+    client.post("/reports", json={"n": 9})
+    assert len(report_jobs._by_payload) <= 3
+
+
+def test_unknown_job(client):
+    assert client.get("/reports/nope").status_code == 404
@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from backend.services import result_cache
+from backend.services.result_cache import ResultCache, file_digest, nbytes
+
+
+def test_lru_by_entries():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_by_bytes():
+    cache = ResultCache(max_entries=100, max_bytes=2500)
+    for key in range(4):
+        cache.set(key, np.zeros(100))
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["memory_bytes"] == 2400
+    assert cache.get(0) is None
+
+
+def test_oversized_value_is_not_kept():
+    cache = ResultCache(max_entries=10, max_bytes=1000)
+    cache.set("small", np.zeros(10))
+    cache.set("big", np.zeros(1000))
+    assert cache.get("big") is None
+    assert cache.get("small") is not None
+
+
+def test_replacing_a_key_updates_bytes():
+    cache = ResultCache(max_bytes=10_000)
+    cache.set("k", np.zeros(500))
+    cache.set("k", np.zeros(10))
+    assert cache.stats()["memory_bytes"] == 80
+    cache.clear()
+    assert cache.stats()["memory_bytes"] == 0
+
+
+def test_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = ResultCache(ttl=10)
+    cache.set("k", np.zeros(10))
+    now[0] += 11
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["memory_bytes"] == 0
+
+
+def test_nbytes_counts_frames_deeply():
+    df = pd.DataFrame({"text": ["x" * 100] * 10})
+    assert nbytes(df) == df.memory_usage(deep=True).sum()
+    assert nbytes({"rows": [df, df]}) > 2 * nbytes(df)
+
+
+def test_file_digest_rewinds():
+    stream = io.BytesIO(b"date,sales\n2020-01-01,1\n")
+    assert file_digest(stream) == file_digest(stream)
+    assert stream.tell() == 0
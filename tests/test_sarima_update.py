@@ -0,0 +1,86 @@
+import json
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from backend.services import executors, model_registry
+
+
+def _daily(start, n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.Series(
+        1000 + rng.normal(0, 50, n),
+        index=pd.date_range(start, periods=n, freq="D"),
+        name="sales"
+    )
+
+
+@pytest.fixture
+def sarima(monkeypatch, tmp_path):
+    """
+    a small fitted SARIMAX stored under tmp_path, as the training CLI would
+    """
+    path = tmp_path / "sarima_model.pkl"
+    monkeypatch.setitem(model_registry.ARTIFACTS, "sarima", (str(path), model_registry._load_pickle))
+    monkeypatch.setattr(model_registry, "SARIMA_PATH", str(path))
+    monkeypatch.setattr(model_registry, "SARIMA_META_PATH", str(tmp_path / "sarima_model.meta.json"))
+    monkeypatch.setattr(model_registry, "_loaded", {})
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        fit = SARIMAX(_daily("2020-01-01", 90, 0), order=(1, 0, 0), trend="c").fit(disp=False)
+    model_registry.store("sarima", fit)
+    model_registry.save_meta({"last_refit": time.time()})
+    return fit
+
+
+def _observations(series):
+    return {"observations": [
+        {"date": day.strftime("%Y-%m-%d"), "sales": float(value)} for day, value in series.items()
+    ]}
+
+
+def test_appends_without_refit(client, sarima):
+    response = client.post("/forecast/sarima/update", json=_observations(_daily("2020-03-31", 10, 1)))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["appended_days"] == 10 and body["refit"] is False
+    assert body["last_observation"] == "2020-04-09"
+
+    updated = model_registry.get_sarima()
+    assert updated.nobs == 100
+    np.testing.assert_allclose(updated.params, sarima.params)
+    with open(model_registry.SARIMA_META_PATH) as f:
+        assert json.load(f)["nobs"] == 100
+
+
+def test_missing_days_count_as_zero(client, sarima):
+    days = _daily("2020-03-31", 5, 2).drop(pd.Timestamp("2020-04-02"))
+    body = client.post("/forecast/sarima/update", json=_observations(days)).get_json()
+    assert body["appended_days"] == 5
+    assert model_registry.get_sarima().data.endog[-3] == 0
+
+
+def test_refits_on_schedule(client, sarima):
+    model_registry.save_meta({"last_refit": time.time() - 365 * 86400})
+    body = client.post("/forecast/sarima/update", json=_observations(_daily("2020-03-31", 10, 3))).get_json()
+    assert body["refit"] is True and body["refit_reason"] == "schedule"
+
+
+def test_old_or_missing_observations_are_rejected(client, sarima):
+    old = client.post("/forecast/sarima/update", json=_observations(_daily("2020-02-01", 5, 4)))
+    assert old.status_code == 400
+    assert client.post("/forecast/sarima/update", json={"observations": []}).status_code == 400
+    assert model_registry.get_sarima().nobs == 90
+
+
+def test_shares_the_sarima_limit(client, sarima, monkeypatch):
+    monkeypatch.setitem(executors._slots, "sarima", executors._Slots("sarima", 0))
+    monkeypatch.setattr(executors, "QUEUE_TIMEOUT", 0)
+    response = client.post("/forecast/sarima/update", json=_observations(_daily("2020-03-31", 5, 5)))
+    assert response.status_code == 429
+    assert model_registry.get_sarima().nobs == 90
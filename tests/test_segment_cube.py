@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from backend.services import segment_cube
+from backend.services.segment_cube import SegmentCube
+
+
+@pytest.fixture
+def orders():
+    rng = np.random.default_rng(0)
+    n = 2000
+    return pd.DataFrame({
+        "order_date": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+        "region": rng.choice(["East", "West", "South"], n),
+        "category": rng.choice(["Furniture", "Technology"], n),
+        "sub_category": rng.choice(["Chairs", "Phones", "Tables"], n),
+        "sales": rng.uniform(1, 900, n)
+    })
+
+
+def _groupby(df, **filters):
+    for col, value in filters.items():
+        df = df[df[col] == value]
+    daily = df.groupby("order_date")["sales"].sum()
+    return daily.index.to_numpy(), daily.to_numpy()
+
+
+SLICES = [
+    {},
+    {"region": "West"},
+    {"category": "Technology"},
+    {"region": "East", "category": "Furniture", "sub_category": "Chairs"},
+]
+
+
+@pytest.mark.parametrize("dense_limit", [segment_cube.DENSE_LIMIT, 0])
+@pytest.mark.parametrize("filters", SLICES)
+def test_series_matches_pandas_groupby(orders, monkeypatch, dense_limit, filters):
+    monkeypatch.setattr(segment_cube, "DENSE_LIMIT", dense_limit)
+    cube = SegmentCube.from_frame(orders)
+    assert sparse.issparse(cube.sales) == (dense_limit == 0)
+
+    series = cube.series(**filters)
+    dates, sales = _groupby(orders, **filters)
+    np.testing.assert_array_equal(series["order_date"].to_numpy(), dates)
+    np.testing.assert_allclose(series["sales"].to_numpy(), sales)
+
+
+def test_dense_and_sparse_agree(orders, monkeypatch):
+    dense = SegmentCube.from_frame(orders)
+    monkeypatch.setattr(segment_cube, "DENSE_LIMIT", 0)
+    sparse_cube = SegmentCube.from_frame(orders)
+    np.testing.assert_allclose(sparse_cube.sales.toarray(), dense.sales)
+    np.testing.assert_array_equal(sparse_cube.counts.toarray(), dense.counts)
+    assert dense.nbytes > 0 and sparse_cube.nbytes > 0
+
+
+def test_unknown_segment_is_empty(orders):
+    assert SegmentCube.from_frame(orders).series(region="North").empty
+
+
+def test_missing_segment_column(orders):
+    with pytest.raises(ValueError):
+        SegmentCube.from_frame(orders.drop(columns="category"))
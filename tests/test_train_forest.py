@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services import model_registry, train_forest
+from backend.services.featureeng import next_features, period_features
+
+
+@pytest.fixture
+def model_dir(monkeypatch, tmp_path):
+    """
+    points the forest artifacts at tmp_path
+    """
+    for name, file in (("sales_forecast", "sales_forecast.pkl"), ("feature_cols", "feature_cols.pkl")):
+        _, loader = model_registry.ARTIFACTS[name]
+        monkeypatch.setitem(model_registry.ARTIFACTS, name, (str(tmp_path / file), loader))
+    monkeypatch.setattr(model_registry, "FOREST_META_PATH", str(tmp_path / "sales_forecast.meta.json"))
+    monkeypatch.setattr(model_registry, "_loaded", {})
+    return tmp_path
+
+
+@pytest.fixture
+def monthly(tmp_path):
+    months = pd.date_range("2015-01-31", periods=36, freq="ME")
+    sales = 1000 + 100 * np.arange(36) + np.random.default_rng(0).normal(0, 20, 36)
+    path = tmp_path / "monthly.csv"
+    pd.DataFrame({"Order Date": months.strftime("%Y-%m-%d"), "Sales": sales}).to_csv(path, index=False)
+    return path
+
+
+def test_trained_forest_records_its_window(model_dir, monthly):
+    meta = train_forest.train(str(monthly), params={"n_estimators": 10})
+    assert meta["rolling_closed"] == "left" and meta["rows"] == 33
+    assert model_registry.rolling_closed() == "left"
+    assert model_registry.get_feature_cols() == train_forest.DEFAULT_FEATURE_COLS
+
+    # a fresh process reads the window back with the model
+    model_registry.reload()
+    assert model_registry.rolling_closed() == "left"
+    assert model_registry.model_stats()["sales_forecast"]["rolling_closed"] == "left"
+
+
+def test_forest_fits_the_window_it_is_served(model_dir, monthly):
+    train_forest.train(str(monthly), params={"n_estimators": 10}, test_size=0.5)
+    cols = model_registry.get_feature_cols()
+    df = pd.read_csv(monthly)
+    values = df["Sales"].to_numpy()
+    dates = pd.to_datetime(df["Order Date"])
+
+    X = pd.DataFrame(next_features(values[-4:-1], period_features(dates.iloc[-1:]), cols), columns=cols)
+    prediction = model_registry.get_predictor().predict(X)[0]
+    # the in-sample row of the last month, seen in training
+    assert prediction == pytest.approx(values[-1], rel=0.05)
+
+
+def test_forests_without_metadata_are_right_closed(model_dir, monthly):
+    train_forest.train(str(monthly), params={"n_estimators": 10})
+    (model_dir / "sales_forecast.meta.json").unlink()
+    model_registry.reload()
+    assert model_registry.rolling_closed() == "right"